@@ -4,25 +4,27 @@
 # @author Joe Coleman
 # -------------------------------------------------
 
-# Add each new bot to this file to be used in the bot_test
-# Be sure to also add the bot's constructor to the dictionary
-from randombot import RandomBot
-from attacbot import AttacBot 
-from turtlebot import TurtleBot
+# Add each new bot to BOTS to be used in the bot_test, as 'module:class'.
+# A bot's module is only imported once the bot is first created
+from registry import Registry
+
+BOTS = {
+    'random': 'randombot:RandomBot',
+    'attac': 'attacbot:AttacBot',
+    'turtle': 'turtlebot:TurtleBot',
+    'mcts': 'mctsbot:MctsBot',
+}
 
 
 class AiList(object):
     def __init__(self):
-        self.bots = dict()
-        self.bots['random'] = RandomBot
-        self.bots['attac'] = AttacBot
-        self.bots['turtle'] = TurtleBot
+        self.bots = Registry(BOTS, 'warlight.bots')
 
     # Returns all available bots by name (key)
     def get_bot_names(self):
-        return self.bots.keys()
+        return self.bots.names()
 
     # Returns an instance of a specific bot
     def create_bot(self, name, map_weights, heuristic):
-        bot = self.bots[name](map_weights, heuristic)
+        bot = self.bots.get(name)(map_weights, heuristic)
         return bot
@@ -0,0 +1,103 @@
+# -------------------------------------------------
+# A compact array view of the Map.  Regions are
+# numbered in the order setup_regions received them,
+# adjacency is stored in CSR form (offsets into one
+# flat neighbor array) and owner/troop/super region
+# values are kept in flat integer arrays, so code that
+# scans the whole map works on contiguous ints instead
+# of Region objects.
+#
+# fork() gives copy-on-write snapshots that share the
+# topology and only copy the owner/troop arrays the
+# first time they are written to.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+from array import array
+from zobrist import ZobristKeys
+import const
+
+NEUTRAL_CODE = 0    # owner code of const.NEUTRAL
+
+
+# Built once by Map.setup_neighbors and kept in sync by Map.set_region
+class ArrayMap(object):
+    def __init__(self, game_map):
+        regions = game_map.region_list
+        self.num_regions = len(regions)
+        self.num_super_regions = len(game_map.super_region_list)
+
+        # Owners are stored as small integer codes, names are only used at the edges
+        self.owner_codes = {const.NEUTRAL: NEUTRAL_CODE}
+        self.owner_names = [const.NEUTRAL]
+
+        self.owner = array('i', [self.owner_code(region.owner) for region in regions])
+        self.troops = array('i', [region.troop_count for region in regions])
+        self.super_region = array('i', [region.super_region.index for region in regions])
+        self.super_region_size = array('i', [len(super_region.regions)
+                                             for super_region in game_map.super_region_list])
+        self.bonus = array('i', [super_region.bonus_armies for super_region in game_map.super_region_list])
+
+        # CSR adjacency: the neighbors of region i are adjacency[offsets[i]:offsets[i + 1]]
+        self.offsets = array('i', [0])
+        self.adjacency = array('i')
+        for region in regions:
+            self.adjacency.extend(neighbor.index for neighbor in region.neighbors)
+            self.offsets.append(len(self.adjacency))
+
+        self.shared = False     # True while the owner/troop arrays are also used by a snapshot
+
+        # Zobrist hash of the owner/troop state, updated on every set_region
+        self.zobrist = ZobristKeys()
+        self.hash = self.zobrist.hash_state(self.owner, self.troops)
+
+    # Returns the code for an owner name, assigning a new one the first time it is seen
+    def owner_code(self, name):
+        code = self.owner_codes.get(name)
+        if code is None:
+            code = len(self.owner_names)
+            self.owner_codes[name] = code
+            self.owner_names.append(name)
+        return code
+
+    # Records a new owner and troop count for the region at `index`
+    def set_region(self, index, owner, troop_count):
+        self.set_code(index, self.owner_code(owner), troop_count)
+
+    # Same as set_region with the owner already given as a code
+    def set_code(self, index, code, troop_count):
+        if self.shared:
+            self.owner = array('i', self.owner)
+            self.troops = array('i', self.troops)
+            self.shared = False
+        key = self.zobrist.key
+        self.hash ^= key(index, self.owner[index], self.troops[index]) ^ key(index, code, troop_count)
+        self.owner[index] = code
+        self.troops[index] = troop_count
+
+    # Returns a copy-on-write snapshot of the current owners and troops
+    def fork(self):
+        self.shared = True
+        return MapSnapshot(self)
+
+
+# A search node made by ArrayMap.fork.  It shares the topology and owner codes with
+# the map it came from and starts out sharing its owner/troop arrays as well; they
+# are copied the first time either side writes, so siblings never see each other
+class MapSnapshot(ArrayMap):
+    def __init__(self, parent):
+        self.num_regions = parent.num_regions
+        self.num_super_regions = parent.num_super_regions
+        self.owner_codes = parent.owner_codes
+        self.owner_names = parent.owner_names
+        self.super_region = parent.super_region
+        self.super_region_size = parent.super_region_size
+        self.bonus = parent.bonus
+        self.offsets = parent.offsets
+        self.adjacency = parent.adjacency
+        self.owner = parent.owner
+        self.troops = parent.troops
+        self.shared = True
+        self.zobrist = parent.zobrist
+        self.hash = parent.hash
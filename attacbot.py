@@ -15,14 +15,13 @@
 # work with our modified map and split from the bot class to
 # provide a convenient way for us to create new AIs
 
-from randombot import MyRandom
+from battle import min_attackers
+from placement import allocate
+import movegen
 from regionsorter import Sorter
 from bot import Bot, PlaceArmyBuilder, AttackTransferBuilder, PickStartingBuilder
-from const import PLACE_ARMIES, ATTACK_TRANSFER, NO_MOVES
-from math import fmod, pi
-from time import clock
-import time
-from map import Map
+
+ATTACK_CONFIDENCE = 0.7     # capture chance an attack is measured against
 
 # AttacBot decides to attack enemy positions over spreading army out to neutral
 # territory 
@@ -39,30 +38,28 @@ class AttacBot(Bot):
         LOCATION FOR PLACING TROOPS '''
     def pick_starting_regions(self, options):
         option = self.parse_pick_starting_regions(options)
-        ordered_regions = Sorter.sorting(option, self, True)
+        ordered_regions = Sorter.top(option, self, 6, True)
         builder = PickStartingBuilder()
-        builder.add_all(ordered_regions[:6])
+        builder.add_all(ordered_regions)
         return builder.to_string()
 
     # Places up to 2 armies on random regions
     ''' REPLACE SHUFFLED_REGIONS WITH TUPLE FOR split_last_update WHICH SPLITS 
         THE LIST OF REGIONS INTO player_owned , neighbors , outliers ''' 
     def place_armies(self, time_limit):
-        start = time.time()
         placements = PlaceArmyBuilder(self.name)
         troops_remaining = self.available_armies
         owned, neighbors, outliers = self.map.split_last_update(self.name)
 
-        if self.turn_elapsed == 1:
-            owned = Sorter.sorting(owned, self, True)
-            best = owned[0]
+        if self.turn_elapsed == 1 and owned:
+            best = Sorter.top(owned, self, 1, True)[0]
             placements.add(best.id, troops_remaining)
             troops_remaining = 0
         else:
             regions = []
             vulnerable = {}
             for i in neighbors :
-                regions.extend(Map.get_owned_in_list(i.neighbors, self.name))
+                regions.extend(self.map.get_owned_in_list(i.neighbors, self.name))
 
             for region in regions:
                 if region in vulnerable :
@@ -79,9 +76,8 @@ class AttacBot(Bot):
             index = 0
             length = len(ordered_vuln)
             while troops_remaining and index < length:     
-                end = time.time()
-                if end - start > .3:
-                    return placements.to_string()
+                if self.deadline.expired():
+                    return self.finish_placements(placements)
 
                 region = ordered_vuln[index]
                 if troops_remaining > 1:
@@ -94,81 +90,66 @@ class AttacBot(Bot):
                     troops_remaining -= 1
                 index += 1
 
-            if troops_remaining > 0 :
-                placements.add(ordered_vuln[0].id, troops_remaining)
-                ordered_vuln[0].troop_count += troops_remaining
-                troops_remaining = 0
+            for region, qty in allocate(self.map, self.name, troops_remaining, deadline=self.deadline):
+                placements.add(region.id, qty)
+                region.troop_count += qty
+            troops_remaining = 0
 
         self.turn_elapsed = self.turn_elapsed + 1
-        return placements.to_string()
+        return self.finish_placements(placements)
 
-    # Currently checks whether a region has more than six troops placed to attack,
-    # or transfers if more than 1 unit is available.
+    # Every region sends its highest priority move: an attack that is at least
+    # ATTACK_CONFIDENCE likely to capture, scaled by how far it exceeds the armies
+    # needed, or a transfer towards the regions with more enemy neighbors.  A region
+    # holds instead when no move beats the number of edges of its busiest neighbor.
+    # Ties go to the neighbor listed first, and moves are sent highest priority first
     def attack_transfer(self, time_limit):
-        start = time.time()
         attack_transfers = AttackTransferBuilder(self.name)
-        owned_regions = self.map.get_owned_regions(self.name)
-
-        num_enemies = dict()
-        for region in owned_regions:
-            enemies = 0
-            for neighbor in region.neighbors:
-                if self.name != neighbor.owner:
-                    enemies += 1
-            num_enemies[region.id] = enemies
-
-        prioritize = []
-        # Setting up priority values for attacking unowned regions
-        for region in owned_regions:
-            for neighbor in region.neighbors:
-                if neighbor.owner != self.name:
-                    # if neighbor.owner in self.opponents:
-                    edges = len(neighbor.neighbors)
-                    priority = edges * ((region.troop_count - 1) / neighbor.troop_count)
-                    prioritize.append({
-                        "region": region,
-                        "neighbor": neighbor,
-                        "troops": region.troop_count - 1,
-                        "priority": priority,
-                    })
-
-                    no_attack = edges
-                    prioritize.append({
-                        "region": region,
-                        "neighbor": neighbor,
-                        "troops": 0,
-                        "priority": no_attack,
-                    })
-                else:
-                    edges = len(neighbor.neighbors)
-                    if num_enemies[region.id] == 0:
-                        priority = edges * 10
-                    else:
-                        priority = edges * (num_enemies[neighbor.id] / num_enemies[region.id])
-                    prioritize.append({
-                        "region": region,
-                        "neighbor": neighbor,
-                        "troops": region.troop_count - 1,
-                        "priority": priority,
-                    })
-
-                    no_attack = edges
-                    prioritize.append({
-                        "region": region,
-                        "neighbor": neighbor,
-                        "troops": 0,
-                        "priority": no_attack,
-                    })
-
-        prioritize.sort(key=lambda to_move: to_move["priority"], reverse=True)
-
-        for move in prioritize:
-            if move["region"].troop_count > 1:
-                if move["troops"] > 1:
-                    attack_transfers.add(move["region"].id, move["neighbor"].id, move["troops"])
-                move["region"].troop_count = 1
-                end = time.time()
-                if end - start > 1.6:
-                    return attack_transfers.to_string()
+        num_enemies = EnemyCounts(self.name)
+        order = {region: i for i, region in enumerate(self.map.get_owned_regions(self.name))}
+
+        candidates = movegen.moves(self.map, self.name, ATTACK_CONFIDENCE, toward_frontier=False)
+        ranked = movegen.best_per_region(candidates, lambda move: self.move_priority(move, num_enemies))
+        ranked.sort(key=lambda entry: (-entry[0][0], order[entry[1].source], -entry[0][1]))
+        for priority, move in ranked:
+            if priority < self.hold_priority(move.source):
+                continue
+            if move.armies > 1:
+                attack_transfers.add(move.source.id, move.target.id, move.armies)
+            move.source.troop_count = 1
+            if self.deadline.expired():
+                return attack_transfers.to_string()
 
         return attack_transfers.to_string()
+
+    # (priority, -neighbor position) of an attack or transfer from movegen
+    @staticmethod
+    def move_priority(move, num_enemies):
+        edges = len(move.target.neighbors)
+        position = -move.source.neighbors.index(move.target)
+        if movegen.is_attack(move):
+            # Ratio of troops available to the troops needed for a confident capture
+            needed = min_attackers(move.target.troop_count, ATTACK_CONFIDENCE)
+            return edges * (move.armies / needed) if needed else 0, position
+        if num_enemies[move.source] == 0:
+            return edges * 10, position
+        return edges * (num_enemies[move.target] / num_enemies[move.source]), position
+
+    # (priority, -neighbor position) of holding: the edges of the busiest neighbor
+    @staticmethod
+    def hold_priority(region):
+        edges = [len(neighbor.neighbors) for neighbor in region.neighbors]
+        most = max(edges)
+        return most, -edges.index(most)
+
+
+# Number of neighbors not owned by `name`, counted for a Region the first time it is looked up
+class EnemyCounts(dict):
+    def __init__(self, name):
+        super(EnemyCounts, self).__init__()
+        self.name = name
+
+    def __missing__(self, region):
+        count = sum(1 for neighbor in region.neighbors if neighbor.owner != self.name)
+        self[region] = count
+        return count
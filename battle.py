@@ -0,0 +1,151 @@
+# -------------------------------------------------
+# Precomputed battle outcomes for the Warlight rules:
+# every attacking army has a 60% chance to destroy a
+# defender and every defending army a 70% chance to
+# destroy an attacker.  The region is captured when all
+# defenders are destroyed and an attacker survives.
+#
+# The shared table is built once, when the module is
+# imported, up to a troop cap so bots look up outcomes
+# instead of summing binomials.  Bigger battles use a
+# normal approximation, so no lookup ever builds a
+# table during a turn.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+from bisect import bisect_left
+import math
+import const
+
+DEFAULT_TROOP_CAP = 100     # largest defending army the default table covers, bigger battles are approximated
+
+
+# Returns rows[n][k], the chance of exactly k successes in n trials, for every n up to max_n
+def binomial_rows(max_n, p):
+    rows = [[1.0]]
+    for n in range(1, max_n + 1):
+        prev = rows[-1]
+        row = [0.0] * (n + 1)
+        for k in range(n):
+            row[k] += prev[k] * (1 - p)
+            row[k + 1] += prev[k] * p
+        rows.append(row)
+    return rows
+
+
+# Holds the capture chance and expected survivors for every attacker/defender pair.
+# Defenders go up to troop_cap and attackers up to twice that, so the minimum
+# attackers for any practical confidence can be found inside the table
+class BattleTable(object):
+    def __init__(self, troop_cap=DEFAULT_TROOP_CAP, attack_chance=const.TAG_ATTACKER_KILL_CHANCE,
+                 defend_chance=const.TAG_DEFENDER_KILL_CHANCE):
+        self.troop_cap = troop_cap
+        self.attacker_cap = 2 * troop_cap
+        self.attack_chance = attack_chance
+        self.defend_chance = defend_chance
+
+        # Tables are indexed [defenders][attackers] so each row is increasing in attackers
+        self.win = []
+        self.survivors = []
+        attack_rows = binomial_rows(self.attacker_cap, attack_chance)
+        defend_rows = binomial_rows(troop_cap, defend_chance)
+
+        # at_least[a] = chance `a` attackers destroy at least d defenders, updated as d grows
+        at_least = [1.0] * (self.attacker_cap + 1)
+        for d in range(troop_cap + 1):
+            if d > 0:
+                for a in range(self.attacker_cap + 1):
+                    if d - 1 <= a:
+                        at_least[a] -= attack_rows[a][d - 1]
+                    at_least[a] = max(at_least[a], 0.0)
+            win_row, survivor_row = self.defender_row(d, at_least, defend_rows[d])
+            self.win.append(win_row)
+            self.survivors.append(survivor_row)
+
+    # Builds the win and survivor rows against `d` defenders
+    def defender_row(self, d, at_least, defend_pmf):
+        win_row = [0.0] * (self.attacker_cap + 1)
+        survivor_row = [0.0] * (self.attacker_cap + 1)
+        below = 0.0     # chance the defenders destroy fewer than `a` attackers
+        total = 0.0     # sum over k < a of (a - k) * P(k attackers destroyed)
+        for a in range(1, self.attacker_cap + 1):
+            if a - 1 <= d:
+                below += defend_pmf[a - 1]
+            total += below
+            win_row[a] = at_least[a] * min(below, 1.0)
+            survivor_row[a] = total / below if below > 0 else 0.0
+        return win_row, survivor_row
+
+    # Normal approximation of the capture chance for battles beyond the table
+    def approximate_win(self, attackers, defenders):
+        return normal_at_least(attackers, self.attack_chance, defenders) * \
+            (1.0 - normal_at_least(defenders, self.defend_chance, attackers))
+
+    # Expected survivors for battles beyond the table: attackers less the expected losses
+    def approximate_survivors(self, attackers, defenders):
+        return max(1.0, attackers - defenders * self.defend_chance)
+
+    # True if the pair is covered by the table
+    def covers(self, attackers, defenders):
+        return 0 <= defenders <= self.troop_cap and 0 <= attackers <= self.attacker_cap
+
+    # Chance that `attackers` armies capture a region held by `defenders` armies
+    def win_probability(self, attackers, defenders):
+        if attackers <= 0:
+            return 0.0
+        if self.covers(attackers, defenders):
+            return self.win[defenders][attackers]
+        return self.approximate_win(attackers, defenders)
+
+    # Expected attacking armies that move into the region when the attack succeeds
+    def expected_survivors(self, attackers, defenders):
+        if attackers <= 0:
+            return 0.0
+        if self.covers(attackers, defenders):
+            return self.survivors[defenders][attackers]
+        return self.approximate_survivors(attackers, defenders)
+
+    # Fewest attackers that capture `defenders` armies with at least `confidence`
+    # chance, or None if no attack inside the table is good enough
+    def min_attackers(self, defenders, confidence):
+        if defenders > self.troop_cap:
+            return None
+        row = self.win[defenders]
+        attackers = bisect_left(row, confidence)
+        if attackers > self.attacker_cap:
+            return None
+        return max(attackers, 1)
+
+
+# Chance of at least `k` successes in `n` trials with chance `p`, by the normal
+# approximation with continuity correction
+def normal_at_least(n, p, k):
+    if k <= 0:
+        return 1.0
+    if k > n:
+        return 0.0
+    deviation = math.sqrt(n * p * (1 - p))
+    return 0.5 * math.erfc((k - 0.5 - n * p) / (deviation * math.sqrt(2.0)))
+
+
+default_table = BattleTable()   # shared table used by the module level functions
+
+
+# Rebuilds the shared table to cover up to `troop_cap` defenders.  Call it at set up,
+# never during a turn
+def set_troop_cap(troop_cap):
+    global default_table
+    default_table = BattleTable(troop_cap)
+
+
+def win_probability(attackers, defenders):
+    return default_table.win_probability(attackers, defenders)
+
+
+def expected_survivors(attackers, defenders):
+    return default_table.expected_survivors(attackers, defenders)
+
+
+def min_attackers(defenders, confidence):
+    return default_table.min_attackers(defenders, confidence)
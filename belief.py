@@ -0,0 +1,166 @@
+# -------------------------------------------------
+# Belief state over the fog of war.  Map.update_map
+# only tells the bot about regions it can see and
+# opponent_moves only about the last turn, so this
+# keeps what was seen before: the last owner and
+# troops of every region with the turn it was seen,
+# an income estimate per player from its placements,
+# and a guess of the troops on regions out of view.
+#
+# Totals per owner (regions, troops, troops per super
+# region and bonus income) are kept up to date as
+# sightings change, so strength queries are O(1).
+# Per turn history is kept in fixed size ring buffers,
+# one entry per turn.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+from collections import deque
+import const
+
+HISTORY_TURNS = 10          # turns of placements, moves and strength kept per player
+HIDDEN_GROWTH_TURNS = 5     # most turns of unseen reinforcement added to a hidden region's troops
+
+
+class Belief(object):
+    def __init__(self, game_map, history=HISTORY_TURNS):
+        self.map = game_map
+        self.history = history
+        self.reset()
+
+    # Forgets everything; every region is believed neutral, never seen.  Called by the
+    # map once its regions are set up and when it is reset
+    def reset(self):
+        num_regions = self.map.num_regions
+        self.turn = 0
+        self.move_turns = 0             # turns of opponent moves recorded
+        self.owner = [const.NEUTRAL] * num_regions                          # last seen owner, by Region.index
+        self.troops = [const.STARTING_TROOPS_PER_REGION] * num_regions      # last seen troops
+        self.seen = [-1] * num_regions                                      # turn last seen, -1 if never
+        self.region_totals = {}         # owner -> regions believed owned
+        self.troop_totals = {}          # owner -> troops last seen on those regions
+        self.super_region_troops = {}   # owner -> [troops believed in each super region]
+        self.super_region_counts = {}   # owner -> [regions believed owned in each super region]
+        self.bonus = {}                 # owner -> bonus of super regions believed owned completely
+        self.placed = {}                # owner -> deque of armies seen placed, one entry per turn
+        self.attacks = {}               # owner -> deque of attack/transfer lists, one entry per turn
+        self.strength_history = {}      # owner -> deque of (turn, regions, troops)
+        for super_region in self.map.super_region_list:
+            for region in super_region.regions:
+                self.add(region.index, super_region.index, const.NEUTRAL, const.STARTING_TROOPS_PER_REGION)
+
+    # Records the regions seen this turn (Map.last_update) and starts a new turn
+    def observe(self, regions):
+        self.turn += 1
+        turn = self.turn
+        owners = self.owner
+        troops = self.troops
+        seen = self.seen
+        for region in regions:
+            index = region.index
+            seen[index] = turn
+            if region.owner != owners[index] or region.troop_count != troops[index]:
+                super_index = region.super_region.index
+                self.remove(index, super_index)
+                self.add(index, super_index, region.owner, region.troop_count)
+        for owner, regions_owned in self.region_totals.items():
+            if owner != const.NEUTRAL and regions_owned:
+                self.strength_history.setdefault(owner, deque(maxlen=self.history)).append(
+                    (turn, regions_owned, self.troop_totals[owner]))
+
+    # Records the opponent moves of this turn, as parsed into Map.opponent_place_armies
+    # and Map.opponent_attack_move.  Every player with a history gets an entry each
+    # turn, empty (0 placed, no moves) when none of its moves were seen
+    def observe_moves(self, place_armies, attack_transfer):
+        self.move_turns += 1
+        placed = {owner: sum(qty for region_id, qty in placements) for owner, placements in place_armies.items()}
+        for owner in set(self.placed).union(placed, attack_transfer):
+            self.ring(self.placed, owner, 0).append(placed.get(owner, 0))
+            self.ring(self.attacks, owner, []).append(attack_transfer.get(owner, []))
+
+    # The history of `owner` in `rings`, started with `empty` entries for the turns
+    # recorded before it was first seen so that every history lines up by turn
+    def ring(self, rings, owner, empty):
+        buffer = rings.get(owner)
+        if buffer is None:
+            buffer = deque([empty] * min(self.move_turns - 1, self.history), maxlen=self.history)
+            rings[owner] = buffer
+        return buffer
+
+    def add(self, index, super_index, owner, troop_count):
+        self.owner[index] = owner
+        self.troops[index] = troop_count
+        self.region_totals[owner] = self.region_totals.get(owner, 0) + 1
+        self.troop_totals[owner] = self.troop_totals.get(owner, 0) + troop_count
+        counts = self.super_region_counts.get(owner)
+        if counts is None:
+            counts = [0] * self.map.num_super_regions
+            self.super_region_counts[owner] = counts
+            self.super_region_troops[owner] = [0] * self.map.num_super_regions
+        self.super_region_troops[owner][super_index] += troop_count
+        counts[super_index] += 1
+        super_region = self.map.super_region_list[super_index]
+        if counts[super_index] == len(super_region.regions):
+            self.bonus[owner] = self.bonus.get(owner, 0) + super_region.bonus_armies
+
+    def remove(self, index, super_index):
+        owner = self.owner[index]
+        troop_count = self.troops[index]
+        self.region_totals[owner] -= 1
+        self.troop_totals[owner] -= troop_count
+        self.super_region_troops[owner][super_index] -= troop_count
+        counts = self.super_region_counts[owner]
+        super_region = self.map.super_region_list[super_index]
+        if counts[super_index] == len(super_region.regions):
+            self.bonus[owner] -= super_region.bonus_armies
+        counts[super_index] -= 1
+
+    # Owner a region was last seen with
+    def region_owner(self, region):
+        return self.owner[region.index]
+
+    # Turns since a region was last seen (0 if seen this turn), None if never seen
+    def age(self, region):
+        seen = self.seen[region.index]
+        return None if seen < 0 else self.turn - seen
+
+    # Troops believed on a region: what was last seen, plus for a player's region out
+    # of view its share of that player's income for every turn unseen (up to
+    # HIDDEN_GROWTH_TURNS)
+    def estimated_troops(self, region):
+        index = region.index
+        owner = self.owner[index]
+        troops = self.troops[index]
+        if owner == const.NEUTRAL or self.seen[index] == self.turn:
+            return troops
+        hidden_turns = min(self.turn - max(self.seen[index], 0), HIDDEN_GROWTH_TURNS)
+        return troops + hidden_turns * self.income(owner) // max(self.region_totals[owner], 1)
+
+    # Armies `owner` is believed to receive each turn: its base armies plus the bonus of
+    # the super regions it is believed to own, or the most it was seen placing lately
+    # if that is more
+    def income(self, owner):
+        income = const.TAG_BASE_ARMIES + self.bonus.get(owner, 0)
+        placed = self.placed.get(owner)
+        if placed:
+            income = max(income, max(placed))
+        return income
+
+    # Regions `owner` is believed to own
+    def regions_owned(self, owner):
+        return self.region_totals.get(owner, 0)
+
+    # Troops last seen on every region `owner` is believed to own
+    def strength(self, owner):
+        return self.troop_totals.get(owner, 0)
+
+    # Troops last seen on the regions of a super region `owner` is believed to own
+    def super_region_strength(self, owner, super_region):
+        troops = self.super_region_troops.get(owner)
+        return troops[super_region.index] if troops is not None else 0
+
+    # Regions of a super region `owner` is believed to own
+    def super_region_count(self, owner, super_region):
+        counts = self.super_region_counts.get(owner)
+        return counts[super_region.index] if counts is not None else 0
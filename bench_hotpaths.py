@@ -0,0 +1,176 @@
+# -------------------------------------------------
+# Micro-benchmarks for the Map and bot hot paths:
+# update_map, split_last_update, get_owned_regions,
+# Sorter.sorting and every bot's place_armies and
+# attack_transfer.
+#
+# The state each benchmark runs on comes from a short
+# local game, so the map looks like a real mid game
+# position.  It runs on the default map and on maps
+# from mapgen.py of the requested sizes.
+# Every benchmark is warmed up, repeated, and reported
+# as percentiles in microseconds (optionally as JSON).
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import argparse
+import json
+import time
+import ailist
+import const
+import engine
+import heuristics
+import map_weights
+import mapgen
+from regionsorter import Sorter
+
+
+# The commands player 0 received in a short game on `game_map`, split into the
+# setup commands and one list per round
+class Scenario(object):
+    def __init__(self, game_map, weights, heuristic, rounds, seed):
+        bot_list = ailist.AiList()
+        players = [bot_list.create_bot('attac', weights, heuristic), bot_list.create_bot('random', weights, heuristic)]
+        received = []
+        run_cmd = players[0].run_cmd
+
+        def recording_run_cmd(parts):
+            received.append(list(parts))
+            return run_cmd(parts)
+
+        players[0].run_cmd = recording_run_cmd
+        engine.Game(players, game_map, seed, max_rounds=rounds).play()
+
+        self.setup = []
+        self.turns = []
+        for parts in received:
+            if parts[0] == const.SETTINGS and parts[1] == const.STARTING_ARMIES:
+                self.turns.append([])
+            if parts[0] == const.PICK_STARTING_REGIONS or parts[0] == const.GO:
+                continue
+            if self.turns:
+                self.turns[-1].append(parts)
+            else:
+                self.setup.append(parts)
+
+    # A bot set up for the map with the state of round `turn` (default the last)
+    def bot(self, name, weights, heuristic, turn=-1):
+        bot = ailist.AiList().create_bot(name, weights, heuristic)
+        for parts in self.setup:
+            bot.run_cmd(parts)
+        for parts in self.turns[turn]:
+            bot.run_cmd(parts)
+        return bot
+
+    # The update_map command of round `turn`
+    def update_map(self, turn=-1):
+        for parts in self.turns[turn]:
+            if parts[0] == const.UPDATE_MAP:
+                return parts
+        return [const.UPDATE_MAP]
+
+
+# Times `run` (called with no arguments) after `warmup` untimed calls.  `prepare`,
+# if given, is called untimed before every call
+def measure(run, warmup, repeats, prepare=None):
+    samples = []
+    for i in range(warmup + repeats):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed)
+    return summarize(samples)
+
+
+# Percentiles of a list of times, in microseconds
+def summarize(samples):
+    micro = [sample * 1e6 for sample in samples]
+    return {
+        'runs': len(micro),
+        'min': min(micro) if micro else 0.0,
+        'mean': sum(micro) / len(micro) if micro else 0.0,
+        'p50': engine.percentile(micro, 50),
+        'p90': engine.percentile(micro, 90),
+        'p99': engine.percentile(micro, 99),
+        'max': max(micro) if micro else 0.0,
+    }
+
+
+# Runs every benchmark on one map and returns {benchmark name: summary}
+def run_benchmarks(game_map, weights, bots, warmup, repeats, rounds, seed, go_time):
+    heuristic = heuristics.HeuristicList().create_heuristic('Regions Not Captured')
+    scenario = Scenario(game_map, weights, heuristic, rounds, seed)
+    results = {}
+
+    # Map queries, on a bot holding the last round's state.  update_map alternates
+    # between the last two rounds so every call has real changes to apply
+    bot = scenario.bot('random', weights, heuristic)
+    updates = [scenario.update_map(-2 if len(scenario.turns) > 1 else -1), scenario.update_map(-1)]
+    calls = [0]
+
+    def update_map():
+        bot.run_cmd(updates[calls[0] % 2])
+        calls[0] += 1
+
+    results['Map.update_map'] = measure(update_map, warmup, repeats)
+    bot.run_cmd(updates[1])
+    results['Map.split_last_update'] = measure(lambda: bot.map.split_last_update(bot.name), warmup, repeats)
+    results['Map.get_owned_regions'] = measure(lambda: bot.map.get_owned_regions(bot.name), warmup, repeats)
+    owned = bot.map.get_owned_regions(bot.name)
+    results['Sorter.sorting'] = measure(lambda: Sorter.sorting(owned, bot, True), warmup, repeats)
+
+    # Bot phases.  The round's state commands are replayed untimed before every run so
+    # each decision starts from the same position
+    place = [const.GO, const.PLACE_ARMIES, str(go_time)]
+    attack = [const.GO, const.ATTACK_TRANSFER, str(go_time)]
+    for name in bots:
+        player = scenario.bot(name, weights, heuristic)
+
+        def reset(player=player):
+            for parts in scenario.turns[-1]:
+                player.run_cmd(parts)
+
+        def turn(player=player):
+            reset(player)
+            player.run_cmd(place)
+
+        results[name + '.place_armies'] = measure(lambda player=player: player.run_cmd(place), warmup, repeats,
+                                                  reset)
+        results[name + '.attack_transfer'] = measure(lambda player=player: player.run_cmd(attack), warmup,
+                                                     repeats, turn)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the Map and bot hot paths')
+    parser.add_argument('--regions', type=int, nargs='*', default=[1000, 10000],
+                        help='sizes of the generated maps run after the default map')
+    parser.add_argument('--bots', nargs='+', default=None, help='bot names from AiList (default all)')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=10, help='rounds played to reach the benchmark state')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--go-time', type=int, default=100, help='ms sent with each go command')
+    parser.add_argument('--json', default=None, help='write the results to this file')
+    args = parser.parse_args()
+
+    bot_names = args.bots or sorted(ailist.AiList().get_bot_names())
+    report = {}
+    maps = [('default map', engine.GameMap(), map_weights.UniformWeights())]
+    for num_regions in args.regions:
+        generated = mapgen.GeneratedMap(num_regions, args.seed)
+        maps.append(('{n} regions'.format(n=num_regions), generated.game_map(), generated.weights()))
+    for label, game_map, weights in maps:
+        report[label] = run_benchmarks(game_map, weights, bot_names, args.warmup, args.repeats, args.rounds, args.seed,
+                                       args.go_time)
+        print(label)
+        for name, stats in report[label].items():
+            print('  {name:28} p50 {p50:12.1f} us  p90 {p90:12.1f} us  p99 {p99:12.1f} us  max {max:12.1f} us'
+                  .format(name=name, **stats))
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
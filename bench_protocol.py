@@ -0,0 +1,109 @@
+# -------------------------------------------------
+# Benchmark of the protocol input path.  Replays a
+# recorded stream of server commands through both
+# the old text path (str split + run_cmd) and the raw
+# bytes path used by Bot.run (run_line), on a fresh
+# bot each pass, and reports the time per command.
+# Setup commands are replayed untimed before each pass.
+#
+# A stream can be recorded from a local engine game
+# with --record, one server line per line of the file.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import argparse
+import time
+import ailist
+import const
+import engine
+import heuristics
+import map_weights
+
+# Commands that make the bot think rather than parse; skipped unless --with-go
+SEARCH_COMMANDS = (const.GO, const.PICK_STARTING_REGIONS)
+
+
+# Plays one local game and writes every command player 0 received to `path`
+def record_stream(path, bots, seed):
+    bot_list = ailist.AiList()
+    weight = map_weights.MapWeightList().create_map_weight('uniform')
+    heuristic = heuristics.HeuristicList().create_heuristic('Regions Not Captured')
+    players = [bot_list.create_bot(name, weight, heuristic) for name in bots]
+    lines = []
+    run_cmd = players[0].run_cmd
+
+    def recording_run_cmd(parts):
+        lines.append(' '.join(parts))
+        return run_cmd(parts)
+
+    players[0].run_cmd = recording_run_cmd
+    engine.Game(players, seed=seed).play()
+    with open(path, 'w') as stream:
+        stream.write('\n'.join(lines) + '\n')
+    return len(lines)
+
+
+# Reads a stream file as raw lines and splits it into the setup commands and the
+# per turn commands, dropping the commands the bot would search on
+def load_stream(path, with_go):
+    with open(path, 'rb') as stream:
+        lines = [line for line in stream if line.strip()]
+    setup_commands = (const.SETTINGS.encode(), const.SETUP_MAP.encode())
+    setup = [line for line in lines if line.startswith(setup_commands)]
+    turns = [line for line in lines if not line.startswith(setup_commands)]
+    if not with_go:
+        skipped = tuple(command.encode() for command in SEARCH_COMMANDS)
+        turns = [line for line in turns if not line.startswith(skipped)]
+    return setup, turns
+
+
+# The text path Bot.run used before reading bytes
+def run_text(bot, lines):
+    for line in lines:
+        bot.run_cmd(line.decode().strip().split())
+
+
+def run_bytes(bot, lines):
+    for line in lines:
+        bot.run_line(line)
+
+
+# Best time over `repeats` passes of the stream through `runner`, on a new bot each pass
+def time_path(runner, setup, lines, bot_name, repeats):
+    bot_list = ailist.AiList()
+    weight = map_weights.MapWeightList().create_map_weight('uniform')
+    heuristic = heuristics.HeuristicList().create_heuristic('Regions Not Captured')
+    best = None
+    for _ in range(repeats):
+        bot = bot_list.create_bot(bot_name, weight, heuristic)
+        run_bytes(bot, setup)
+        start = time.perf_counter()
+        runner(bot, lines)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a server command stream through the text and bytes paths')
+    parser.add_argument('stream', help='file with one server command per line')
+    parser.add_argument('--record', action='store_true', help='play a local game and record the stream first')
+    parser.add_argument('--bots', nargs=2, default=['attac', 'random'], help='bots for the recorded game')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--bot', default='random', help='bot that replays the stream')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--with-go', action='store_true', help='also replay go and pick_starting_regions')
+    args = parser.parse_args()
+
+    if args.record:
+        count = record_stream(args.stream, args.bots, args.seed)
+        print('Recorded {n} commands to {path}'.format(n=count, path=args.stream))
+
+    setup, lines = load_stream(args.stream, args.with_go)
+    text = time_path(run_text, setup, lines, args.bot, args.repeats)
+    raw = time_path(run_bytes, setup, lines, args.bot, args.repeats)
+    for name, elapsed in (('text', text), ('bytes', raw)):
+        print('{name:6} {total:.6f} s  {per:.2f} us/command'.format(
+            name=name, total=elapsed, per=elapsed / len(lines) * 1e6 if lines else 0.0))
+    print('speedup {s:.2f}x over {n} commands'.format(s=text / raw if raw else 0.0, n=len(lines)))
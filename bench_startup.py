@@ -0,0 +1,111 @@
+# -------------------------------------------------
+# Cold start benchmark: the time from starting a new
+# bot process to its answer to the first command that
+# needs one (pick_starting_regions), which covers the
+# interpreter, every import and the map setup.
+#
+# Each run starts a fresh interpreter that creates the
+# bot through the lazy registries and reads commands
+# from stdin like it would on the server.  With
+# --eager every registered bot, weight and heuristic is
+# imported first, to show what lazy loading saves.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import const
+import engine
+
+# Run in the bot process: sys.argv is [bot, weight, heuristic, 'eager' or 'lazy']
+BOT_PROGRAM = '''
+import sys
+import ailist
+import heuristics
+import map_weights
+lists = (ailist.AiList(), map_weights.MapWeightList(), heuristics.HeuristicList())
+if sys.argv[4] == 'eager':
+    lists[0].bots.load_all()
+    lists[1].map_weights.load_all()
+    lists[2].heuristics.load_all()
+weight = lists[1].create_map_weight(sys.argv[2])
+heuristic = lists[2].create_heuristic(sys.argv[3])
+lists[0].create_bot(sys.argv[1], weight, heuristic).run()
+'''
+
+
+# The commands sent before and including the first one that is answered
+def startup_commands(game_map):
+    lines = [[const.SETTINGS, const.YOUR_BOT, const.TAG_PLAYER_NAME],
+             [const.SETTINGS, const.OPPONENT_BOT, const.TAG_OPPONENT_NAME]]
+    lines.extend(game_map.setup_commands())
+    options = [game_map.region_ids[members[0]] for members in game_map.members]
+    lines.append([const.PICK_STARTING_REGIONS, str(const.TAG_PICK_STARTING_TIME)] + options)
+    return ''.join(' '.join(parts) + '\n' for parts in lines).encode()
+
+
+# Seconds from starting one bot process to reading its first answer
+def cold_start(bot, weight, heuristic, mode, commands):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', BOT_PROGRAM, bot, weight, heuristic, mode], cwd=directory,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        process.stdin.write(commands)
+        process.stdin.flush()
+        answer = process.stdout.readline()
+        elapsed = time.perf_counter() - start
+    finally:
+        process.stdin.close()
+        process.wait()
+    if not answer:
+        raise RuntimeError('{bot} exited without answering'.format(bot=bot))
+    return elapsed
+
+
+# Runs `repeats` cold starts per bot and mode and returns {mode: {bot: summary in ms}}
+def run_benchmark(bots, modes, weight, heuristic, repeats):
+    commands = startup_commands(engine.GameMap())
+    report = {}
+    for mode in modes:
+        report[mode] = {}
+        for bot in bots:
+            samples = [cold_start(bot, weight, heuristic, mode, commands) * 1000 for _ in range(repeats)]
+            report[mode][bot] = {
+                'runs': repeats,
+                'min': min(samples),
+                'p50': engine.percentile(samples, 50),
+                'p90': engine.percentile(samples, 90),
+                'max': max(samples),
+            }
+    return report
+
+
+if __name__ == '__main__':
+    import ailist
+
+    parser = argparse.ArgumentParser(description='Time bot processes from start to their first answer')
+    parser.add_argument('--bots', nargs='+', default=None, help='bot names from AiList (default all)')
+    parser.add_argument('--weight', default='uniform', help='map weight name from MapWeightList')
+    parser.add_argument('--heuristic', default='Regions Not Captured', help='heuristic name from HeuristicList')
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--eager', action='store_true', help='also time processes that import everything first')
+    parser.add_argument('--json', default=None, help='write the results to this file')
+    args = parser.parse_args()
+
+    bot_names = args.bots or sorted(ailist.AiList().get_bot_names())
+    modes = ['lazy', 'eager'] if args.eager else ['lazy']
+    results = run_benchmark(bot_names, modes, args.weight, args.heuristic, args.repeats)
+    for mode, bots in results.items():
+        print(mode)
+        for name, stats in bots.items():
+            print('  {name:10} p50 {p50:8.1f} ms  p90 {p90:8.1f} ms  min {min:8.1f} ms  max {max:8.1f} ms'.format(
+                name=name, **stats))
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
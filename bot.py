@@ -7,15 +7,33 @@
 # -------------------------------------------------
 
 from abc import abstractmethod
-from sys import stdin, stdout
+from sys import intern, stdin, stdout
+import os
+import time
 from map import Map
+from placement import allocate
+from instrument import Instrumentation, NULL_SPAN, command_name
+from transcript import TranscriptWriter
 import const
 
+SAFETY_MARGIN_MS = 50       # time kept back from every go command for parsing and output
+MIN_BUDGET_MS = 5           # smallest budget a phase is ever given
+
+# Share of the time sent with a go command the bot may spend on that phase.  The
+# placement gets half since the attack phase still has to be answered from the same
+# time, the attack phase can use everything that is left
+TIME_SHARE = {const.PLACE_ARMIES: 0.5, const.ATTACK_TRANSFER: 1.0}
+
+TRANSCRIPT_ENV = 'WARLIGHT_TRANSCRIPT'  # Bot.run records a transcript to this path when it is set
+INSTRUMENT_ENV = 'WARLIGHT_INSTRUMENT'  # Bot.run writes its instrumentation as JSON to this path when it is set
+
 
 # Bot is an abstract base class that contains all of the base support for
 # communicating with the server.  The actual ai functionality
 # is implemented in derived classes
 class Bot(object):
+    time_share = TIME_SHARE     # share of each go command's time per phase, bots may override it
+
     def __init__(self, map_weights, heuristic):
         self.map = Map()                            # Game map
         self.name = ''                              # Player name
@@ -24,8 +42,12 @@ class Bot(object):
         self.map_weights = map_weights              # Collection of weights for the map regions and super regions
         self.heuristic = heuristic                  # Heuristic to use in evaluation
         self.command = self.build_command_dict()    # A dictionary of commands the server may make
+        self.token_command = self.build_token_command_dict()    # Commands parsed from raw bytes by run_line
         self.turn_elapsed = 0
         self.new_in_super = [] 
+        self.deadline = Deadline(const.TAG_GO_TIME)  # time budget of the current go command
+        self.transcript = None                      # TranscriptWriter recording every command, if any
+        self.instrumentation = None                 # Instrumentation timing commands and spans, if enabled
     # A dictionary of available commands that could be sent by the game server
     # and the functions that will be executed for the command received
     def build_command_dict(self):
@@ -42,27 +64,100 @@ class Bot(object):
     def run(self):
         # Main loop
         #
-        # Keeps running while being fed data from stdin.
-        # Writes output to stdout, remember to flush!
-        while not stdin.closed:
-            try:
-                rawline = stdin.readline()
-                if len(rawline) == 0:  # End of file check
-                    break
-                line = rawline.strip()
-                if len(line) == 0:  # Empty lines can be ignored
-                    continue
-                # Hacky way to get theaigames version to work with same run_cmd code
-                parts = line.split()
-                response = self.run_cmd(parts)
+        # Reads raw lines from the buffered binary stdin and answers each command
+        # with a single write to the binary stdout, remember to flush!
+        out = stdout.buffer
+        if os.environ.get(TRANSCRIPT_ENV):
+            self.record_transcript(os.environ[TRANSCRIPT_ENV])
+        if os.environ.get(INSTRUMENT_ENV):
+            self.enable_instrumentation()
+        try:
+            for line in stdin.buffer:
+                response = self.run_line(line)
                 if response != '':
-                    stdout.write(response + '\n')
-                    stdout.flush()
-            except EOFError:
-                return
+                    out.write(response.encode() + b'\n')
+                    out.flush()
+        except EOFError:
+            return
+        finally:
+            if self.transcript is not None:
+                self.transcript.close()
+            if self.instrumentation is not None:
+                self.instrumentation.write_json(os.environ[INSTRUMENT_ENV])
+
+    # Runs one raw (bytes) line from the server and returns the response.  The
+    # per turn map commands are parsed straight from the byte tokens, everything
+    # else is decoded and handed to run_cmd
+    def run_line(self, line):
+        tokens = line.split()
+        if not tokens:  # Empty lines can be ignored
+            return ''
+        if self.transcript is not None:
+            self.transcript.command(line.strip())
+        handler = self.token_command.get(tokens[0])
+        if handler is not None:
+            if self.instrumentation is None:
+                response = handler(tokens)
+            else:
+                with self.instrumentation.span(tokens[0].decode()):
+                    response = handler(tokens)
+        else:
+            response = self.dispatch([token.decode() for token in tokens])
+        if self.transcript is not None:
+            self.transcript.response(response)
+        return response
+
+    # Starts recording every command and response to the transcript at `path`,
+    # replacing any transcript already there (see transcript.py)
+    def record_transcript(self, path):
+        self.transcript = TranscriptWriter(path)
+
+    # Starts timing every command and span (see instrument.py) and returns the
+    # Instrumentation collecting them
+    def enable_instrumentation(self):
+        self.instrumentation = Instrumentation()
+        return self.instrumentation
+
+    # A named span for timing a phase of the bot's own code:
+    #     with self.span('search'):
+    # Does nothing unless instrumentation is enabled
+    def span(self, name):
+        if self.instrumentation is None:
+            return NULL_SPAN
+        return self.instrumentation.span(name)
+
+    # Byte level handlers for the commands sent every turn
+    def build_token_command_dict(self):
+        cmd = dict()
+        cmd[const.UPDATE_MAP.encode()] = self.update_map_tokens
+        cmd[const.OPPONENT_MOVES.encode()] = self.opponent_moves_tokens
+        return cmd
+
+    def update_map_tokens(self, tokens):
+        self.map.update_map_tokens(tokens)
+        return ''
+
+    def opponent_moves_tokens(self, tokens):
+        self.map.opponent_moves_tokens(tokens)
+        return ''
 
     # Returns a string of the bot's decision or '' if no response needed
     def run_cmd(self, parts):
+        if self.transcript is None:
+            return self.dispatch(parts)
+        self.transcript.command(' '.join(parts).encode())
+        response = self.dispatch(parts)
+        self.transcript.response(response)
+        return response
+
+    # Runs the handler for an already split command, timing it when instrumented
+    def dispatch(self, parts):
+        if self.instrumentation is None:
+            return self.handle(parts)
+        with self.instrumentation.span(command_name(parts)):
+            return self.handle(parts)
+
+    def handle(self, parts):
         if parts[0] in self.command:
             if parts[0] == const.OPPONENT_MOVES and len(parts) == 1:  # Can receive nothing on opponent moves
                 return self.opponent_moves()
@@ -90,9 +185,9 @@ class Bot(object):
         if sub_command == const.STARTING_ARMIES:
             self.available_armies = int(options[1])
         elif sub_command == const.OPPONENT_BOT:
-            self.opponents.append(options[1])
+            self.opponents.append(intern(options[1]))
         elif sub_command == const.YOUR_BOT:
-            self.name = options[1]
+            self.name = intern(options[1])     # the same object as owner names on the map
         else:
             return 'Unknown sub command: ' + sub_command
         return ''
@@ -107,16 +202,28 @@ class Bot(object):
         self.map.opponent_moves(options)
         return ''
 
-    # Commands for placing armies and move / attacking
+    # Commands for placing armies and move / attacking.  A Deadline for the phase is
+    # started before the bot is asked, see self.deadline
     def go(self, options):
         sub_command = options[0]
         if sub_command == const.PLACE_ARMIES:
+            self.deadline = Deadline(options[1], self.time_share[sub_command])
             return self.place_armies(options[1])
         elif sub_command == const.ATTACK_TRANSFER:
+            self.deadline = Deadline(options[1], self.time_share[sub_command])
             return self.attack_transfer(options[1])
         else:
             return 'Unknown sub command: ' + sub_command
 
+    # Places any armies not yet in `placements` with the placement allocator (all on
+    # one frontier region once the deadline has passed) so a placement cut short
+    # never loses armies.  Returns the output string of the completed placements
+    def finish_placements(self, placements):
+        remaining = self.available_armies - placements.total()
+        for region, qty in allocate(self.map, self.name, remaining, deadline=self.deadline):
+            placements.add(region.id, qty)
+        return placements.to_string()
+
     # Command to choose 6 starting regions from a list of options (space delimited)
     # First argument is the amount of time you have to choose
     # ex: 1 4 2 3 22 19
@@ -149,6 +256,28 @@ class Bot(object):
         return regions
 
 
+# Time budget for one go command, measured on the monotonic clock.  Built from the
+# time string the server sends (in ms), less a safety margin, times the share of it
+# this phase may use.  expired() is a single clock read so search loops can poll it often
+class Deadline(object):
+    def __init__(self, time_limit, share=1.0, margin=SAFETY_MARGIN_MS):
+        self.start = time.monotonic()
+        self.budget = max((int(time_limit) - margin) * share, MIN_BUDGET_MS) / 1000.0
+        self.end = self.start + self.budget
+
+    # True once the budget is used up
+    def expired(self):
+        return time.monotonic() >= self.end
+
+    # Seconds left in the budget (negative once expired)
+    def remaining(self):
+        return self.end - time.monotonic()
+
+    # Seconds since the command was received
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+
 # Used for easy building of the output string for placing armies
 class PlaceArmyBuilder(object):
     def __init__(self, player):
@@ -159,6 +288,10 @@ class PlaceArmyBuilder(object):
     def add(self, region, qty):
         self.actions.append((region, qty))
 
+    # Total armies placed so far
+    def total(self):
+        return sum(action[1] for action in self.actions)
+
     # Convert all queued army placements to a string
     def to_string(self):
         if not self.actions:
@@ -3,15 +3,28 @@
 # from user and then runs those tests on the ones
 # supplied in testlist
 #
+# With arguments (or --config file.json) it runs in
+# batch mode instead: every selected combination runs
+# every selected test N times on a fresh bot and map
+# and reports latency and decision changes as JSON.
+#
 # @author Joe Coleman
 # python3
 # -------------------------------------------------
 
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import sys
 import map_weights
 import heuristics
 import ailist
 from map import RegionMap, SuperRegionMap
 from testlist import TestList
+from engine import percentile
+from instrument import command_name
 import const
 
 
@@ -30,7 +43,13 @@ class BotTester(object):
         # Assigned defaults so PyCharm will stop giving warnings on calls
         self.weight = map_weights.UniformWeights()
         self.heuristic = heuristics.HeuristicList()
-        self.bot = ailist.RandomBot(self.weight, self.heuristic)
+        self.bot = self.bot_list.create_bot('random', self.weight, self.heuristic)
+        self.records = None     # (command, response, wall, cpu) of each timed command while in batch mode
+
+    # Called by Test.run_cmd for every timed command
+    def record(self, cmd, resp, wall, cpu):
+        if self.records is not None:
+            self.records.append((command_name([str(part) for part in cmd]), resp, wall, cpu))
 
     # Let the player choose bot, weight and heuristic
     def setup(self):
@@ -108,11 +127,105 @@ class BotTester(object):
                 self.bot.map.reset_map()
 
 
-if __name__ == '__main__':
+    # Runs `test` `runs` times, each on a fresh bot, with the test's printing
+    # silenced.  Returns the summary of every command the test timed
+    def run_batch_test(self, bot, weight, heuristic, test, runs):
+        commands = {}
+        failures = []
+        for run in range(runs):
+            self.weight = self.weight_list.create_map_weight(weight)
+            self.heuristic = self.heuristic_list.create_heuristic(heuristic)
+            self.bot = self.bot_list.create_bot(bot, self.weight, self.heuristic)
+            self.records = []
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.setup_bot()
+                    self.tests.run_test(test, self)
+            except ValueError as error:
+                failures.append('run {run}: {error!r}'.format(run=run, error=error))
+            for name, resp, wall, cpu in self.records:
+                samples = commands.setdefault(name, {'wall': [], 'cpu': [], 'responses': []})
+                samples['wall'].append(wall)
+                samples['cpu'].append(cpu)
+                samples['responses'].append(resp)
+        self.records = None
+        return {'runs': runs, 'failures': failures,
+                'commands': {name: batch_summary(samples) for name, samples in commands.items()}}
+
+
+# Latency in milliseconds and decision changes of one command over a batch.
+# A decision change is a run whose response differs from the first run's
+def batch_summary(samples):
+    wall = [sample * 1000 for sample in samples['wall']]
+    responses = samples['responses']
+    distinct = {}
+    for resp in responses:
+        distinct[resp] = distinct.get(resp, 0) + 1
+    return {
+        'runs': len(wall),
+        'min_ms': min(wall),
+        'median_ms': percentile(wall, 50),
+        'p99_ms': percentile(wall, 99),
+        'max_ms': max(wall),
+        'cpu_mean_ms': sum(samples['cpu']) * 1000 / len(samples['cpu']),
+        'decision_changes': sum(1 for resp in responses if resp != responses[0]),
+        'responses': distinct,
+    }
+
+
+# Reads the batch settings from the arguments, with a JSON config file (keys named
+# like the arguments) filling in anything not given on the command line
+def batch_arguments(argv):
+    parser = argparse.ArgumentParser(description='Run bot tests unattended and report timing as JSON')
+    parser.add_argument('--config', default=None, help='JSON file with any of the options below')
+    parser.add_argument('--bots', nargs='+', default=None, help='bot names from AiList (default all)')
+    parser.add_argument('--weights', nargs='+', default=None, help='map weight names (default all)')
+    parser.add_argument('--heuristics', nargs='+', default=None, help='heuristic names (default all)')
+    parser.add_argument('--tests', nargs='+', default=None, help='test names from TestList (default all)')
+    parser.add_argument('--runs', type=int, default=None, help='runs of every test (default 10)')
+    parser.add_argument('--json', default=None, help='write the report here instead of stdout')
+    args = parser.parse_args(argv)
+    if args.config:
+        with open(args.config) as config_file:
+            config = json.load(config_file)
+        for key, value in config.items():
+            if getattr(args, key, None) is None:
+                setattr(args, key, value)
+    if args.runs is None:
+        args.runs = 10
+    return args
+
+
+# Runs every selected bot/weight/heuristic combination through every selected test
+def run_batch(args):
     tester = BotTester()
-    tester.setup()
-    try:
-        tester.setup_bot()
-        tester.run()
-    except ValueError as error:
-        print('Test failed.  Error: ' + repr(error))
+    bots = args.bots or list(tester.bot_list.get_bot_names())
+    weights = args.weights or list(tester.weight_list.get_map_weights())
+    heuristic_names = args.heuristics or list(tester.heuristic_list.get_heuristics())
+    tests = args.tests or list(tester.tests.get_tests())
+    report = []
+    for bot, weight, heuristic in itertools.product(bots, weights, heuristic_names):
+        for test in tests:
+            result = tester.run_batch_test(bot, weight, heuristic, test, args.runs)
+            result.update({'bot': bot, 'weight': weight, 'heuristic': heuristic, 'test': test})
+            report.append(result)
+    return report
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        batch_args = batch_arguments(sys.argv[1:])
+        batch_report = run_batch(batch_args)
+        if batch_args.json:
+            with open(batch_args.json, 'w') as output:
+                json.dump(batch_report, output, indent=2)
+        else:
+            print(json.dumps(batch_report, indent=2))
+    else:
+        tester = BotTester()
+        tester.setup()
+        try:
+            tester.setup_bot()
+            tester.run()
+        except ValueError as error:
+            print('Test failed.  Error: ' + repr(error))
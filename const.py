@@ -47,3 +47,9 @@ TAG_NEIGHBORS = '1 2,4,30 2 4,3,5 3 5,6,14 4 5,7 ' \
                 '41,42 41 42'
 TAG_PICK_STARTING_TIME = 10000
 TAG_GO_TIME = 2000
+TAG_MAX_ROUNDS = 100                            # rounds played before the game is decided on regions owned
+TAG_BASE_ARMIES = 5                             # armies every player receives each round before bonuses
+TAG_PICKS_PER_SUPER_REGION = 2                  # starting region options offered from each super region
+TAG_STARTING_REGIONS = 3                        # starting regions each player receives from their picks
+TAG_ATTACKER_KILL_CHANCE = 0.6                  # chance for each attacking army to destroy a defender
+TAG_DEFENDER_KILL_CHANCE = 0.7                  # chance for each defending army to destroy an attacker
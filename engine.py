@@ -0,0 +1,475 @@
+# -------------------------------------------------
+# A local referee that plays two bots against each
+# other in-process.  It follows the game rules used
+# on www.theaigames.com (starting picks, income with
+# super region bonuses, fog of war and battles) and
+# talks to each bot through Bot.run_cmd, so full games
+# can be played without the server.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import argparse
+import random
+import signal
+import time
+import const
+
+PLAYER_NAMES = (const.TAG_PLAYER_NAME, const.TAG_OPPONENT_NAME)
+NEUTRAL = -1    # owner index used by the engine for neutral regions
+
+# Phases that latency is recorded for
+PHASE_PICK = 'pick_starting_regions'
+PHASE_PLACE = const.PLACE_ARMIES
+PHASE_ATTACK = const.ATTACK_TRANSFER
+PHASE_UPDATE = 'update'     # settings, update_map and opponent_moves
+
+# ms given for each go command in batch runs (tournament.py, tuner.py).  Far below the
+# server's TAG_GO_TIME so bots that search until their deadline keep a sweep to minutes
+BATCH_TIME_LIMIT = 100
+
+
+# The static layout of a map parsed from the setup_map strings.  Regions are
+# stored by index so the engine never has to work with string ids mid game.
+class GameMap(object):
+    def __init__(self, super_regions=const.TAG_SUPER_REGIONS, regions=const.TAG_REGIONS,
+                 neighbors=const.TAG_NEIGHBORS):
+        self.super_region_parts = super_regions.split()
+        self.region_parts = regions.split()
+        self.neighbor_parts = neighbors.split()
+
+        self.super_region_ids = self.super_region_parts[0::2]
+        self.bonus = [int(bonus) for bonus in self.super_region_parts[1::2]]
+        super_index = {super_id: i for i, super_id in enumerate(self.super_region_ids)}
+
+        self.region_ids = self.region_parts[0::2]
+        self.index = {region_id: i for i, region_id in enumerate(self.region_ids)}
+        self.super_region = [super_index[super_id] for super_id in self.region_parts[1::2]]
+        self.members = [[] for _ in self.super_region_ids]
+        for i, super_region in enumerate(self.super_region):
+            self.members[super_region].append(i)
+
+        self.neighbors = [[] for _ in self.region_ids]
+        for i in range(0, len(self.neighbor_parts), 2):
+            region = self.index[self.neighbor_parts[i]]
+            for neighbor_id in self.neighbor_parts[i + 1].split(','):
+                neighbor = self.index[neighbor_id]
+                self.neighbors[region].append(neighbor)
+                self.neighbors[neighbor].append(region)
+
+    # The setup_map commands a bot receives before the game starts
+    def setup_commands(self):
+        return [[const.SETUP_MAP, const.SUPER_REGIONS] + self.super_region_parts,
+                [const.SETUP_MAP, const.REGIONS] + self.region_parts,
+                [const.SETUP_MAP, const.NEIGHBORS] + self.neighbor_parts]
+
+
+# Everything recorded about a single finished game
+class GameResult(object):
+    def __init__(self):
+        self.winner = None          # index of the winning player, None on a draw
+        self.rounds = 0             # number of full rounds played
+        self.regions = [0, 0]       # regions owned by each player at the end
+        self.errors = [None, None]  # description of the exception that made a player forfeit
+        self.overtime = [0, 0]      # commands that took longer than the time given by the engine
+
+        # Seconds spent by each player answering commands, keyed on phase
+        self.latency = [{PHASE_PICK: [], PHASE_PLACE: [], PHASE_ATTACK: [], PHASE_UPDATE: []},
+                        {PHASE_PICK: [], PHASE_PLACE: [], PHASE_ATTACK: [], PHASE_UPDATE: []}]
+
+
+# Raised inside the engine when a bot breaks the protocol or crashes
+class Forfeit(Exception):
+    def __init__(self, player, reason):
+        super(Forfeit, self).__init__(reason)
+        self.player = player
+
+
+# Raised inside a bot's command by the interval timer when it runs over its time limit
+class CommandTimeout(Exception):
+    pass
+
+
+# SIGALRM handler used when the engine enforces time limits
+def raise_timeout(signum, frame):
+    raise CommandTimeout('time limit exceeded')
+
+
+# A single game between two bots.  The bots are driven in-process by calling
+# run_cmd with the same argument lists Bot.run would build from the server input
+class Game(object):
+    def __init__(self, bots, game_map=None, seed=None, max_rounds=const.TAG_MAX_ROUNDS,
+                 time_limit=const.TAG_GO_TIME, enforce_limits=False):
+        self.bots = bots
+        self.map = game_map if game_map is not None else GameMap()
+        self.rand = random.Random(seed)
+        self.max_rounds = max_rounds
+        self.time_limit = time_limit
+        self.enforce_limits = enforce_limits    # interrupt commands that run over their time (main thread only)
+        self.time_budget = None     # seconds of bot time after which no new round is started, None for no limit
+        self.time_used = 0.0        # seconds both bots have spent answering commands
+        self.result = GameResult()
+
+        num_regions = len(self.map.region_ids)
+        self.owner = [NEUTRAL] * num_regions
+        self.troops = [const.STARTING_TROOPS_PER_REGION] * num_regions
+        self.seen_moves = [[], []]  # opponent moves each player will be told about next round
+        self.lost = [set(), set()]  # regions each player lost last round, still sent in its next update
+
+    # Plays the game to the end and returns the GameResult
+    def play(self):
+        if self.enforce_limits:
+            previous_handler = signal.signal(signal.SIGALRM, raise_timeout)
+        try:
+            steps = self.steps()
+            request = next(steps)
+            while True:
+                request = self.answer(steps, request)
+        except StopIteration:
+            pass
+        finally:
+            if self.enforce_limits:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous_handler)
+        return self.result
+
+    # The game as a generator of commands: yields a (player, parts, phase, limit) request
+    # for every command a bot has to answer and is sent the response back.  A Forfeit
+    # thrown in ends the game.  play() drives it directly and host.py interleaves many
+    def steps(self):
+        try:
+            yield from self.setup()
+            yield from self.pick_starting_regions()
+            while self.result.rounds < self.max_rounds and self.is_alive(0) and self.is_alive(1) \
+                    and not self.out_of_time():
+                yield from self.play_round()
+                self.result.rounds += 1
+        except Forfeit as forfeit:
+            self.result.errors[forfeit.player] = str(forfeit)
+            self.result.winner = 1 - forfeit.player
+        else:
+            self.result.winner = self.decide_winner()
+        self.result.regions = [self.owner.count(0), self.owner.count(1)]
+
+    # Sends one request from steps() to its bot and returns the next request.  Raises
+    # StopIteration once the game is over
+    def answer(self, steps, request):
+        try:
+            resp = self.send(*request)
+        except Forfeit as forfeit:
+            return steps.throw(forfeit)
+        return steps.send(resp)
+
+    # True once the bots have used up the game's time_budget
+    def out_of_time(self):
+        return self.time_budget is not None and self.time_used >= self.time_budget
+
+    # Sends a command to a player and returns the response, timing it under `phase`.
+    # `limit` is the time in milliseconds the bot was given for the command
+    def send(self, player, parts, phase, limit=None):
+        if self.enforce_limits:
+            signal.setitimer(signal.ITIMER_REAL, (limit or self.time_limit) / 1000.0)
+        start = time.perf_counter()
+        try:
+            resp = self.bots[player].run_cmd(parts)
+        except Exception as error:
+            raise Forfeit(player, '{cmd}: {err!r}'.format(cmd=' '.join(parts[:2]), err=error))
+        finally:
+            if self.enforce_limits:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        elapsed = time.perf_counter() - start
+        self.time_used += elapsed
+        self.result.latency[player][phase].append(elapsed)
+        if limit is not None and elapsed * 1000 > limit:
+            self.result.overtime[player] += 1
+        return resp
+
+    # Names and map layout for both players
+    def setup(self):
+        commands = self.map.setup_commands()
+        for player in range(2):
+            yield player, [const.SETTINGS, const.YOUR_BOT, PLAYER_NAMES[player]], PHASE_UPDATE, None
+            yield player, [const.SETTINGS, const.OPPONENT_BOT, PLAYER_NAMES[1 - player]], PHASE_UPDATE, None
+            for parts in commands:
+                yield player, parts, PHASE_UPDATE, None
+
+    # Offers regions from each super region, then hands them out alternately
+    # following each player's order of preference
+    def pick_starting_regions(self):
+        options = []
+        for members in self.map.members:
+            options.extend(self.rand.sample(members, min(const.TAG_PICKS_PER_SUPER_REGION, len(members))))
+        option_ids = [self.map.region_ids[region] for region in options]
+
+        picks = []
+        for player in range(2):
+            cmd = [const.PICK_STARTING_REGIONS, str(const.TAG_PICK_STARTING_TIME)] + option_ids
+            resp = yield player, cmd, PHASE_PICK, const.TAG_PICK_STARTING_TIME
+            preferred = [self.map.index[region_id] for region_id in resp.split() if region_id in self.map.index]
+            picks.append([region for region in preferred if region in options])
+
+        remaining = set(options)
+        player = self.rand.randrange(2)
+        for _ in range(2 * const.TAG_STARTING_REGIONS):
+            choices = [region for region in picks[player] if region in remaining]
+            region = choices[0] if choices else self.rand.choice(sorted(remaining))
+            remaining.discard(region)
+            self.owner[region] = player
+            player = 1 - player
+
+    # One round: income, map update, orders from both players, then resolution
+    def play_round(self):
+        placements = []
+        moves = []
+        for player in range(2):
+            income = self.income(player)
+            yield player, [const.SETTINGS, const.STARTING_ARMIES, str(income)], PHASE_UPDATE, None
+            yield player, self.update_map_command(player), PHASE_UPDATE, None
+            yield player, [const.OPPONENT_MOVES] + self.seen_moves[player], PHASE_UPDATE, None
+            resp = yield player, [const.GO, const.PLACE_ARMIES, str(self.time_limit)], PHASE_PLACE, self.time_limit
+            placements.append(self.parse_placements(player, resp, income))
+            resp = yield player, [const.GO, const.ATTACK_TRANSFER, str(self.time_limit)], PHASE_ATTACK, self.time_limit
+            moves.append(self.parse_moves(player, resp))
+
+        for player in range(2):
+            for region, qty in placements[player]:
+                self.troops[region] += qty
+        owned_before = list(self.owner)
+
+        done = [[], []]
+        moved_in = [0] * len(self.owner)    # armies that arrived this round and may not move again
+        player = self.rand.randrange(2)
+        queues = [list(reversed(moves[0])), list(reversed(moves[1]))]
+        while queues[0] or queues[1]:
+            if queues[player]:
+                move = self.execute_move(player, queues[player].pop(), moved_in)
+                if move is not None:
+                    done[player].append(move)
+            player = 1 - player
+
+        for player in range(2):
+            self.seen_moves[player] = self.visible_moves(player, placements[1 - player], done[1 - player])
+            self.lost[player] = {region for region, owner in enumerate(owned_before)
+                                 if owner == player and self.owner[region] != player}
+
+    # Resolves one attack or transfer and returns the move as executed, or None if skipped
+    def execute_move(self, player, move, moved_in):
+        from_region, to_region, qty = move
+        if self.owner[from_region] != player:
+            return None
+        qty = min(qty, self.troops[from_region] - moved_in[from_region] - 1)
+        if qty <= 0:
+            return None
+        if self.owner[to_region] == player:
+            self.troops[from_region] -= qty
+            self.troops[to_region] += qty
+            moved_in[to_region] += qty
+        else:
+            self.battle(player, from_region, to_region, qty, moved_in)
+        return from_region, to_region, qty
+
+    # Battle rules from theaigames: every attacking army has a 60% chance to destroy a
+    # defending army and every defending army a 70% chance to destroy an attacking army
+    def battle(self, player, from_region, to_region, attackers, moved_in):
+        defenders = self.troops[to_region]
+        rand = self.rand.random
+        defenders_killed = sum(1 for _ in range(attackers) if rand() < const.TAG_ATTACKER_KILL_CHANCE)
+        attackers_killed = sum(1 for _ in range(defenders) if rand() < const.TAG_DEFENDER_KILL_CHANCE)
+
+        if attackers_killed >= attackers:
+            # Attack wiped out, the defender always keeps at least one army
+            self.troops[from_region] -= attackers
+            self.troops[to_region] -= min(defenders_killed, defenders - 1)
+        elif defenders_killed >= defenders:
+            self.troops[from_region] -= attackers
+            self.owner[to_region] = player
+            self.troops[to_region] = attackers - attackers_killed
+            moved_in[to_region] = attackers - attackers_killed
+        else:
+            self.troops[from_region] -= attackers_killed
+            self.troops[to_region] -= defenders_killed
+
+    # Parses a place_armies response into (region, qty) tuples, dropping anything illegal
+    def parse_placements(self, player, resp, income):
+        placements = []
+        if resp == const.NO_MOVES:
+            return placements
+        remaining = income
+        for placement in resp.split(','):
+            parts = placement.split()
+            if len(parts) != 4 or parts[1] != const.PLACE_ARMIES or parts[2] not in self.map.index:
+                raise Forfeit(player, 'invalid placement: ' + placement.strip())
+            region = self.map.index[parts[2]]
+            try:
+                qty = min(int(parts[3]), remaining)
+            except ValueError:
+                raise Forfeit(player, 'invalid placement: ' + placement.strip())
+            if self.owner[region] == player and qty > 0:
+                placements.append((region, qty))
+                remaining -= qty
+        return placements
+
+    # Parses an attack/transfer response into (from_region, to_region, qty) tuples
+    def parse_moves(self, player, resp):
+        moves = []
+        if resp == const.NO_MOVES:
+            return moves
+        for move in resp.split(','):
+            parts = move.split()
+            if len(parts) != 5 or parts[1] != const.ATTACK_TRANSFER or parts[2] not in self.map.index \
+                    or parts[3] not in self.map.index:
+                raise Forfeit(player, 'invalid attack/transfer: ' + move.strip())
+            from_region = self.map.index[parts[2]]
+            to_region = self.map.index[parts[3]]
+            try:
+                qty = int(parts[4])
+            except ValueError:
+                raise Forfeit(player, 'invalid attack/transfer: ' + move.strip())
+            if to_region in self.map.neighbors[from_region] and qty > 0:
+                moves.append((from_region, to_region, qty))
+        return moves
+
+    # Regions a player can see: everything owned plus every neighbor of those
+    def visible(self, player):
+        visible = set()
+        for region, owner in enumerate(self.owner):
+            if owner == player:
+                visible.add(region)
+                visible.update(self.map.neighbors[region])
+        return visible
+
+    # Builds the update_map command with the fog of war applied.  Regions lost
+    # last round are included so the bot learns it no longer owns them
+    def update_map_command(self, player):
+        parts = [const.UPDATE_MAP]
+        region_ids = self.map.region_ids
+        for region in sorted(self.visible(player) | self.lost[player]):
+            owner = self.owner[region]
+            parts.append(region_ids[region])
+            parts.append(PLAYER_NAMES[owner] if owner != NEUTRAL else const.NEUTRAL)
+            parts.append(str(self.troops[region]))
+        return parts
+
+    # The opponent's placements and moves that touched a region `player` can see
+    def visible_moves(self, player, placements, moves):
+        visible = self.visible(player)
+        name = PLAYER_NAMES[1 - player]
+        region_ids = self.map.region_ids
+        parts = []
+        for region, qty in placements:
+            if region in visible:
+                parts.extend([name, const.PLACE_ARMIES, region_ids[region], str(qty)])
+        for from_region, to_region, qty in moves:
+            if from_region in visible or to_region in visible:
+                parts.extend([name, const.ATTACK_TRANSFER, region_ids[from_region], region_ids[to_region], str(qty)])
+        return parts
+
+    # Base armies plus the bonus of every fully owned super region
+    def income(self, player):
+        income = const.TAG_BASE_ARMIES
+        for super_region, members in enumerate(self.map.members):
+            if all(self.owner[region] == player for region in members):
+                income += self.map.bonus[super_region]
+        return income
+
+    def is_alive(self, player):
+        return player in self.owner
+
+    # Last player standing wins, otherwise the player with the most regions
+    def decide_winner(self):
+        regions = [self.owner.count(0), self.owner.count(1)]
+        if regions[0] == regions[1]:
+            return None
+        return 0 if regions[0] > regions[1] else 1
+
+
+# Returns the value at percentile `pct` (0 - 100) of a list of samples
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
+# Plays `games` games between bots made by the two factories (called with no
+# arguments for every game) and swaps seats every game.
+# Returns a summary dictionary of wins, rounds and per phase latency
+def play_match(factories, games, seed=None, game_map=None, max_rounds=const.TAG_MAX_ROUNDS,
+               enforce_limits=False, time_limit=const.TAG_GO_TIME):
+    rand = random.Random(seed)
+    game_map = game_map if game_map is not None else GameMap()
+    wins = [0, 0]
+    draws = 0
+    rounds = 0
+    forfeits = [0, 0]
+    latency = [dict(), dict()]
+    for game in range(games):
+        seats = (0, 1) if game % 2 == 0 else (1, 0)
+        bots = [factories[seats[0]](), factories[seats[1]]()]
+        result = Game(bots, game_map, rand.getrandbits(32), max_rounds, time_limit, enforce_limits).play()
+        rounds += result.rounds
+        if result.winner is None:
+            draws += 1
+        else:
+            wins[seats[result.winner]] += 1
+        for player in range(2):
+            if result.errors[player] is not None:
+                forfeits[seats[player]] += 1
+            for phase, samples in result.latency[player].items():
+                latency[seats[player]].setdefault(phase, []).extend(samples)
+    return {
+        'games': games,
+        'wins': wins,
+        'draws': draws,
+        'forfeits': forfeits,
+        'average_rounds': rounds / games if games else 0.0,
+        'latency': [{phase: {'mean': sum(samples) / len(samples) if samples else 0.0,
+                             'p50': percentile(samples, 50),
+                             'p99': percentile(samples, 99),
+                             'max': max(samples) if samples else 0.0}
+                     for phase, samples in player_latency.items()} for player_latency in latency],
+    }
+
+
+if __name__ == '__main__':
+    import ailist
+    import heuristics
+    import map_weights
+    import mapgen
+
+    parser = argparse.ArgumentParser(description='Play local games between two bots')
+    parser.add_argument('bots', nargs=2, help='bot names from AiList')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--weight', default='uniform', help='map weight name from MapWeightList')
+    parser.add_argument('--heuristic', default='Regions Not Captured', help='heuristic name from HeuristicList')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--time-limit', type=int, default=const.TAG_GO_TIME, help='ms given for each go command')
+    parser.add_argument('--enforce-limits', action='store_true', help='forfeit bots that run over their time')
+    parser.add_argument('--regions', type=int, default=None, help='play on a generated map of this many regions')
+    args = parser.parse_args()
+
+    bot_list = ailist.AiList()
+    weight = map_weights.MapWeightList().create_map_weight(args.weight)
+    heuristic = heuristics.HeuristicList().create_heuristic(args.heuristic)
+    match_map = None
+    if args.regions is not None:
+        generated = mapgen.GeneratedMap(args.regions, args.seed)
+        match_map = generated.game_map()
+        weight = generated.weights()
+    factories = [lambda name=name: bot_list.create_bot(name, weight, heuristic) for name in args.bots]
+
+    start = time.perf_counter()
+    summary = play_match(factories, args.games, args.seed, match_map, enforce_limits=args.enforce_limits,
+                         time_limit=args.time_limit)
+    elapsed = time.perf_counter() - start
+    print('{a} {wa} - {wb} {b}  ({d} draws, forfeits {fa}/{fb})'.format(
+        a=args.bots[0], b=args.bots[1], wa=summary['wins'][0], wb=summary['wins'][1], d=summary['draws'],
+        fa=summary['forfeits'][0], fb=summary['forfeits'][1]))
+    print('Average rounds: {r:.1f}'.format(r=summary['average_rounds']))
+    for name, phases in zip(args.bots, summary['latency']):
+        for phase in (PHASE_PLACE, PHASE_ATTACK):
+            stats = phases.get(phase, {})
+            print('{name:8} {phase:16} mean {mean:.6f} s  p99 {p99:.6f} s'.format(
+                name=name, phase=phase, mean=stats.get('mean', 0.0), p99=stats.get('p99', 0.0)))
+    print('{n} games in {t:.2f} s ({rate:.0f} games/minute)'.format(
+        n=args.games, t=elapsed, rate=args.games / elapsed * 60 if elapsed else 0.0))
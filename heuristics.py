@@ -5,6 +5,12 @@
 # -------------------------------------------------
 
 from abc import abstractmethod
+from registry import Registry
+
+# Heuristics by name, as 'module:class' so only the heuristics used are imported
+HEURISTICS = {
+    'Regions Not Captured': 'heuristics:RegionsNotCaptured',
+}
 
 
 # Abstract base class for a heuristic
@@ -14,6 +20,52 @@ class Heuristic(object):
     def evaluate(bot):
         return
 
+    # Scores many candidates against the bot's current map and returns a list with
+    # one score per candidate.  A candidate is either a list of moves in the form
+    # Map.do_temp_update takes (from_region, from_qty, to_region, to_qty, to_region_owner)
+    # or an ArrayMap/MapSnapshot of the same map.
+    #
+    # This default applies each candidate with temp updates and calls evaluate, so
+    # every heuristic supports it; heuristics that can score the changes directly
+    # override it
+    @classmethod
+    def evaluate_many(cls, bot, candidates):
+        game_map = bot.map
+        scores = []
+        for candidate in candidates:
+            moves = candidate_moves(game_map, candidate)
+            for move in moves:
+                game_map.do_temp_update(*move)
+            scores.append(cls.evaluate(bot))
+            for _ in moves:
+                game_map.undo_last_temp_update()
+        return scores
+
+
+# The moves of a candidate for Heuristic.evaluate_many.  A state is turned into one
+# move per region that differs from the map, setting its owner and troops in place
+def candidate_moves(game_map, candidate):
+    if not hasattr(candidate, 'owner'):
+        return candidate
+    arrays = game_map.arrays
+    if candidate.owner is arrays.owner and candidate.troops is arrays.troops:
+        return []
+    moves = []
+    names = candidate.owner_names
+    for index, (owner, troops) in enumerate(zip(candidate.owner, candidate.troops)):
+        if owner != arrays.owner[index] or troops != arrays.troops[index]:
+            region = game_map.region_list[index]
+            moves.append((region, 0, region, troops - region.troop_count, names[owner]))
+    return moves
+
+
+# For each candidate, the owner every region it changes ends up with
+def final_owners(game_map, candidate):
+    owners = {}
+    for from_region, from_qty, to_region, to_qty, to_region_owner in candidate_moves(game_map, candidate):
+        owners[to_region] = to_region_owner
+    return owners
+
 
 # Returns the number of regions the player has not captured
 # This is NOT an admissible heuristic
@@ -23,18 +75,34 @@ class RegionsNotCaptured(Heuristic):
         num_owned = len(bot.map.get_owned_regions(bot.name))
         return bot.map.num_regions - num_owned
 
+    # Counts owned regions once and then only looks at the regions each candidate
+    # changes hands, instead of recounting the map per candidate
+    @classmethod
+    def evaluate_many(cls, bot, candidates):
+        game_map = bot.map
+        name = bot.name
+        visible = game_map.owners.visible
+        base = game_map.num_regions - len(game_map.get_owned_regions(name))
+        scores = []
+        for candidate in candidates:
+            score = base
+            for region, owner in final_owners(game_map, candidate).items():
+                if region in visible and (owner == name) != (region.owner == name):
+                    score += -1 if owner == name else 1
+            scores.append(score)
+        return scores
+
 
 # All available map weights in a convenient dictionary for use in bot_tests
 class HeuristicList(object):
     def __init__(self):
-        self.heuristics = dict()
-        self.heuristics['Regions Not Captured'] = RegionsNotCaptured
+        self.heuristics = Registry(HEURISTICS, 'warlight.heuristics')
 
     # Returns all available map weights by name (key)
     def get_heuristics(self):
-        return self.heuristics.keys()
+        return self.heuristics.names()
 
     # Returns an instance of a specific map weight
     def create_heuristic(self, name):
-        heuristic = self.heuristics[name]()
+        heuristic = self.heuristics.get(name)()
         return heuristic
@@ -0,0 +1,129 @@
+# -------------------------------------------------
+# Hosts many local games in one process with asyncio.
+# Every game is an engine.Game whose steps() generator
+# is driven one command at a time, and the host hands
+# control to the next game after every command, so
+# hundreds of games share one interpreter and one set
+# of imports instead of a process each.
+#
+# Bots keep answering through Bot.run_cmd exactly as
+# in engine.py.  Time limits are per game: each command
+# is timed on its own (and interrupted with
+# --enforce-limits) and a game stops starting new
+# rounds once its bots have used its time budget.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import argparse
+import asyncio
+import random
+import signal
+import time
+import const
+import engine
+
+
+class GameHost(object):
+    def __init__(self, concurrency=100, enforce_limits=False, time_budget=None):
+        self.concurrency = concurrency          # most games in progress at once
+        self.enforce_limits = enforce_limits    # interrupt commands that run over their time limit
+        self.time_budget = time_budget          # seconds of bot time each game may use, None for no limit
+        self.active = 0
+        self.peak = 0                           # most games that were in progress at once
+
+    # Plays one game to the end, letting the other games run after every command
+    async def play(self, game):
+        game.enforce_limits = self.enforce_limits
+        game.time_budget = self.time_budget
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        steps = game.steps()
+        try:
+            request = next(steps)
+            while True:
+                await asyncio.sleep(0)
+                request = game.answer(steps, request)
+        except StopIteration:
+            pass
+        finally:
+            self.active -= 1
+        return game.result
+
+    # Plays `count` games made by `make_game(number)` with up to `concurrency` in
+    # progress at once.  `done(number, result)`, if given, is called as each one ends
+    async def play_all(self, make_game, count, done=None):
+        numbers = iter(range(count))
+
+        async def worker():
+            for number in numbers:
+                result = await self.play(make_game(number))
+                if done is not None:
+                    done(number, result)
+
+        await asyncio.gather(*[worker() for _ in range(min(self.concurrency, count))])
+
+    # Runs play_all on a new event loop and waits for every game
+    def run(self, make_game, count, done=None):
+        if self.enforce_limits:
+            previous_handler = signal.signal(signal.SIGALRM, engine.raise_timeout)
+        try:
+            asyncio.run(self.play_all(make_game, count, done))
+        finally:
+            if self.enforce_limits:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous_handler)
+
+
+if __name__ == '__main__':
+    import ailist
+    import heuristics
+    import map_weights
+
+    parser = argparse.ArgumentParser(description='Play many local games between two bots in one process')
+    parser.add_argument('bots', nargs=2, help='bot names from AiList')
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=100, help='games in progress at once')
+    parser.add_argument('--weight', default='uniform', help='map weight name from MapWeightList')
+    parser.add_argument('--heuristic', default='Regions Not Captured', help='heuristic name from HeuristicList')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--time-limit', type=int, default=const.TAG_GO_TIME, help='ms given for each go command')
+    parser.add_argument('--time-budget', type=float, default=None, help='seconds of bot time each game may use')
+    parser.add_argument('--enforce-limits', action='store_true', help='forfeit bots that run over their time')
+    args = parser.parse_args()
+
+    bot_list = ailist.AiList()
+    weight = map_weights.MapWeightList().create_map_weight(args.weight)
+    heuristic = heuristics.HeuristicList().create_heuristic(args.heuristic)
+    game_map = engine.GameMap()
+    rand = random.Random(args.seed)
+    seeds = [rand.getrandbits(32) for _ in range(args.games)]
+
+    # Seats swap every game, as in engine.play_match
+    def make_game(number):
+        names = args.bots if number % 2 == 0 else args.bots[::-1]
+        bots = [bot_list.create_bot(name, weight, heuristic) for name in names]
+        return engine.Game(bots, game_map, seeds[number], time_limit=args.time_limit)
+
+    wins = [0, 0]
+    draws = [0]
+    forfeits = [0, 0]
+
+    def record(number, result):
+        seats = (0, 1) if number % 2 == 0 else (1, 0)
+        if result.winner is None:
+            draws[0] += 1
+        else:
+            wins[seats[result.winner]] += 1
+        for player in range(2):
+            if result.errors[player] is not None:
+                forfeits[seats[player]] += 1
+
+    host = GameHost(args.concurrency, args.enforce_limits, args.time_budget)
+    start = time.perf_counter()
+    host.run(make_game, args.games, record)
+    elapsed = time.perf_counter() - start
+    print('{a} {wa} - {wb} {b}  ({d} draws, forfeits {fa}/{fb})'.format(
+        a=args.bots[0], b=args.bots[1], wa=wins[0], wb=wins[1], d=draws[0], fa=forfeits[0], fb=forfeits[1]))
+    print('{n} games in {t:.2f} s ({rate:.0f} games/minute), up to {p} at once'.format(
+        n=args.games, t=elapsed, rate=args.games / elapsed * 60 if elapsed else 0.0, p=host.peak))
@@ -0,0 +1,136 @@
+# -------------------------------------------------
+# Opt-in instrumentation for bots.  Bot.run_cmd times
+# every command (go place_armies and go attack/transfer
+# separately) and bot code can open named spans around
+# its own phases.  Each span keeps a count, wall and CPU
+# time totals, the slowest run and a histogram with
+# power of two microsecond buckets, and everything can
+# be exported as JSON.
+#
+# Bots carry no Instrumentation unless one is enabled:
+# Bot.span then hands back a shared do nothing span, so
+# the hooks can stay in place during live play.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import time
+import const
+
+NUM_BUCKETS = 32    # histogram bucket k counts runs shorter than 2^k microseconds
+
+# Commands whose first option is a sub command worth timing on its own
+SUB_COMMANDS = (const.SETUP_MAP, const.SETTINGS, const.GO)
+
+
+# Name a command is recorded under, e.g. 'go place_armies' or 'update_map'
+def command_name(parts):
+    if parts[0] in SUB_COMMANDS and len(parts) > 1:
+        return parts[0] + ' ' + parts[1]
+    return parts[0]
+
+
+# Span used while instrumentation is off
+class NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+# Totals for one span name
+class SpanStats(object):
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.max_wall = 0.0
+        self.histogram = [0] * NUM_BUCKETS
+
+    def add(self, wall, cpu):
+        self.count += 1
+        self.wall += wall
+        self.cpu += cpu
+        if wall > self.max_wall:
+            self.max_wall = wall
+        self.histogram[min(int(wall * 1e6).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'wall_total': self.wall,
+            'wall_mean': self.wall / self.count if self.count else 0.0,
+            'wall_max': self.max_wall,
+            'cpu_total': self.cpu,
+            'cpu_mean': self.cpu / self.count if self.count else 0.0,
+            # Upper bound of the bucket in microseconds -> runs in it
+            'histogram_us': {str(1 << bucket): runs for bucket, runs in enumerate(self.histogram) if runs},
+        }
+
+
+# A timed region.  Spans opened inside another are recorded under 'outer/inner'
+class Span(object):
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.path = name
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self):
+        stack = self.instrumentation.stack
+        if stack:
+            self.path = stack[-1].path + '/' + self.name
+        stack.append(self)
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.instrumentation.stack.pop()
+        self.instrumentation.record(self.path, wall, cpu)
+        return False
+
+
+class Instrumentation(object):
+    def __init__(self):
+        self.stats = {}     # span path -> SpanStats
+        self.counts = {}    # counter name -> count
+        self.stack = []     # spans currently open
+
+    # Opens a span, use as `with instrumentation.span('search'):`
+    def span(self, name):
+        return Span(self, name)
+
+    def record(self, path, wall, cpu):
+        stats = self.stats.get(path)
+        if stats is None:
+            stats = SpanStats()
+            self.stats[path] = stats
+        stats.add(wall, cpu)
+
+    # Adds `amount` to a named counter, e.g. search iterations
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def to_dict(self):
+        return {
+            'spans': {path: stats.to_dict() for path, stats in sorted(self.stats.items())},
+            'counts': dict(self.counts),
+        }
+
+    # json is imported here since every bot loads this module but few write reports
+    def write_json(self, path):
+        import json
+        with open(path, 'w') as output:
+            json.dump(self.to_dict(), output, indent=2)
+
+    def reset(self):
+        self.stats.clear()
+        self.counts.clear()
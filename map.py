@@ -8,6 +8,10 @@
 # @author Joe Coleman
 # -------------------------------------------------
 
+from sys import intern
+from arraymap import ArrayMap
+from belief import Belief
+from topology import get_topology
 import const
 
 
@@ -15,10 +19,18 @@ import const
 class Map(object):
     def __init__(self):
         self.regions = {}           # All regions in the map (all places that can be owned)
+        self.region_list = []       # All regions in the order they were set up (by Region.index)
         self.num_regions = 0        # Number of regions
         self.super_regions = {}     # All super regions in the map
+        self.super_region_list = []  # All super regions in the order they were set up (by SuperRegion.index)
         self.num_super_regions = 0  # Number of super regions
+        self.arrays = None          # ArrayMap view of the map, built once the neighbors are known
+        self.topology = None        # Shared static Topology (degree tables), built with the arrays
+        self.owners = OwnerIndex(self)  # Per owner indexes over the visible regions
+        self.belief = Belief(self)      # Last seen state of every region and opponent estimates, across turns
         self.last_update = []       # All regions that the player can see (or were lost last turn)
+        self.regions_by_token = {}  # Regions keyed by their id as bytes, for parsing raw server input
+        self.token_strings = {}     # Decoded strings of raw tokens (names and ids) already seen
         self.temp_updates = []      # Holds all temporary updates to perform do-undo map changes for evaluation
 
         # Hold tuples of moves and army placement seen by the player but made by an opponent player
@@ -34,25 +46,59 @@ class Map(object):
     def get_super_region_by_id(self, super_region_id):
         return self.super_regions[super_region_id]
 
-    # Returns a list of of references to region instances owned by `owner`.
+    # Returns a list of of references to region instances owned by `owner`, in
+    # the order of the last map update
     def get_owned_regions(self, owner):
         return [region for region in self.last_update if region.owner == owner]
 
+    # Returns the number of visible regions in a super region owned by `owner`
+    def get_owned_count(self, super_region, owner):
+        counts = self.owners.super_region_counts.get(owner)
+        return counts[super_region.index] if counts is not None else 0
+
+    # Returns the armies `owner` receives each turn: base armies plus the bonus of
+    # every super region it owns completely
+    def get_income(self, owner):
+        return const.TAG_BASE_ARMIES + self.owners.bonus.get(owner, 0)
+
+    # Returns a list of visible regions owned by `owner` that border a region it does not own
+    def get_frontier(self, owner):
+        return list(self.owners.frontier.get(owner, ()))
+
+    # Changes the owner and troops of a region.  All map changes go through here
+    # so the array view and owner indexes stay in sync with the Region objects
+    def set_region(self, region, owner, troop_count):
+        previous_owner = region.owner
+        region.owner = owner
+        region.troop_count = troop_count
+        if self.arrays is not None:
+            self.arrays.set_region(region.index, owner, troop_count)
+        if previous_owner != owner:
+            self.owners.owner_changed(region, previous_owner)
+
     # Performs an update on the map with the new temporary values
     # and records the change in the temp_updates list to be undone later
     def do_temp_update(self, from_region, from_qty, to_region, to_qty, to_region_owner):
-        from_region.troop_count = from_region.troop_count - from_qty
-        to_region.troop_count = to_region.troop_count + to_qty
         previous_owner = to_region.owner
-        to_region.owner = to_region_owner
+        self.set_region(from_region, from_region.owner, from_region.troop_count - from_qty)
+        self.set_region(to_region, to_region_owner, to_region.troop_count + to_qty)
         self.temp_updates.append((from_region, from_qty, to_region, to_qty, previous_owner))
 
     # Undoes the last temp update
     def undo_last_temp_update(self):
         from_region, from_qty, to_region, to_qty, previous_owner = self.temp_updates.pop()
-        from_region.troop_count = from_region.troop_count + from_qty
-        to_region.troop_count = to_region.troop_count - to_qty
-        to_region.owner = previous_owner
+        self.set_region(to_region, previous_owner, to_region.troop_count - to_qty)
+        self.set_region(from_region, from_region.owner, from_region.troop_count + from_qty)
+
+    # Returns the Zobrist hash of the current owners and (bucketed) troop counts.
+    # Kept up to date by every update, so it can key a TranspositionTable
+    def get_hash(self):
+        return self.arrays.hash
+
+    # Returns a copy-on-write MapSnapshot of the current owners and troops.  Changes made
+    # to the snapshot (or its forks) never touch the map, so nothing has to be undone
+    def snapshot(self):
+        return self.arrays.fork()
 
     # Undo all temp updates to restore map to current state
     def undo_all_temp_updates(self):
@@ -68,7 +114,7 @@ class Map(object):
         for region in self.last_update:
             if region.owner == player:
                 player_owned.append(region)
-            elif player in [neighbor.owner for neighbor in region.neighbors]:
+            elif any(neighbor.owner == player for neighbor in region.neighbors):
                 neighbors.append(region)
             else:
                 outlier.append(region)
@@ -86,21 +132,24 @@ class Map(object):
     # Initializes super regions from server string input
     def setup_super_regions(self, regions):
         for i in range(0, len(regions), 2):
-            super_region = SuperRegion(regions[i], int(regions[i + 1]))
+            super_region = SuperRegion(intern(regions[i]), int(regions[i + 1]), self.num_super_regions)
             self.super_regions[regions[i]] = super_region
+            self.super_region_list.append(super_region)
             self.num_super_regions = self.num_super_regions + 1
 
     # Initializes regions from server string input
     def setup_regions(self, regions):
         for i in range(0, len(regions), 2):
             super_region = self.get_super_region_by_id(regions[i + 1])
-            region = Region(regions[i], super_region)
-            self.regions[regions[i]] = region
+            region = Region(intern(regions[i]), super_region, self.num_regions)
+            self.regions[region.id] = region
+            self.regions_by_token[regions[i].encode()] = region
+            self.region_list.append(region)
             super_region.regions.append(region)
             self.num_regions = self.num_regions + 1
 
-    # Initializes neighbors and determines which regions have a border
-    # that crosses super regions
+    # Initializes neighbors and the static topology, which also determines
+    # which regions have a border that crosses super regions
     def setup_neighbors(self, regions):
         for i in range(0, len(regions), 2):
             region = self.get_region_by_id(regions[i])
@@ -108,14 +157,11 @@ class Map(object):
             for neighbor in neighbors:
                 region.neighbors.append(neighbor)
                 neighbor.neighbors.append(region)
-        for key in self.regions.keys():
-            region = self.regions[key]
-            if region.is_on_super_region_border:
-                continue
-            for neighbor in region.neighbors:
-                if neighbor.super_region.id != region.super_region.id:
-                    region.is_on_super_region_border = True
-                    neighbor.is_on_super_region_border = True
+        self.topology = get_topology(self)
+        for region in self.region_list:
+            region.is_on_super_region_border = self.topology.external_degree[region.index] > 0
+        self.arrays = ArrayMap(self)
+        self.belief.reset()
 
     # Called to update map every round
     def update_map(self, regions):
@@ -123,17 +169,75 @@ class Map(object):
         self.temp_updates = []
         for i in range(0, len(regions), 3):
             region = self.get_region_by_id(regions[i])
-            region.owner = regions[i + 1]
-            region.troop_count = int(regions[i + 2])
+            owner = intern(regions[i + 1])
+            troop_count = int(regions[i + 2])
+            # Most visible regions are unchanged from the last turn.  Bots may write
+            # Region.troop_count directly, so the arrays are checked as well
+            if owner != region.owner or troop_count != region.troop_count \
+                    or troop_count != self.arrays.troops[region.index]:
+                self.set_region(region, owner, troop_count)
             self.last_update.append(region)
+        self.owners.set_visible(self.last_update)
+        self.belief.observe(self.last_update)
 #        self.turn_elapsed = self.turn_elapsed + 1
 
+    # Same as update_map, reading straight from the raw tokens (bytes) of the server's
+    # line, starting at tokens[start].  Ids and names are looked up without decoding
+    def update_map_tokens(self, tokens, start=1):
+        last_update = []
+        self.temp_updates = []
+        regions_by_token = self.regions_by_token
+        token_string = self.token_string
+        set_region = self.set_region
+        for i in range(start, len(tokens) - 2, 3):
+            region = regions_by_token[tokens[i]]
+            owner = token_string(tokens[i + 1])
+            troop_count = int(tokens[i + 2])
+            # Most visible regions are unchanged from the last turn (see update_map)
+            if owner != region.owner or troop_count != region.troop_count \
+                    or troop_count != self.arrays.troops[region.index]:
+                set_region(region, owner, troop_count)
+            last_update.append(region)
+        self.last_update = last_update
+        self.owners.set_visible(last_update)
+        self.belief.observe(last_update)
+
+    # Same as opponent_moves, reading the raw tokens (bytes) of the server's line
+    def opponent_moves_tokens(self, tokens, start=1):
+        place_armies = dict()
+        attack_transfer = dict()
+        token_string = self.token_string
+        place_token = const.PLACE_ARMIES.encode()
+        i = start
+        while i + 3 < len(tokens):
+            name = token_string(tokens[i])
+            if tokens[i + 1] == place_token:
+                place_armies.setdefault(name, []).append((token_string(tokens[i + 2]), int(tokens[i + 3])))
+                i = i + 4
+            else:
+                attack_transfer.setdefault(name, []).append((token_string(tokens[i + 2]), token_string(tokens[i + 3]),
+                                                             int(tokens[i + 4])))
+                i = i + 5
+        self.opponent_attack_move = attack_transfer
+        self.opponent_place_armies = place_armies
+        self.belief.observe_moves(place_armies, attack_transfer)
+
+    # Decodes a raw token, caching the result since names and ids repeat every turn.
+    # Strings are interned so they are the same objects as names from the str path
+    def token_string(self, token):
+        string = self.token_strings.get(token)
+        if string is None:
+            string = intern(token.decode())
+            self.token_strings[token] = string
+        return string
+
     # Parse the opponent moves into place_armies and attack/transfer commands and
     # store each in a list keyed on the opponent's name
     def opponent_moves(self, options):
         if options == '':       # no moves seen
             self.opponent_place_armies = {}
             self.opponent_attack_move = {}
+            self.belief.observe_moves({}, {})
             return
         place_armies = dict()
         attack_transfer = dict()
@@ -151,36 +255,121 @@ class Map(object):
                 i = i + 5
         self.opponent_attack_move = attack_transfer
         self.opponent_place_armies = place_armies
+        self.belief.observe_moves(place_armies, attack_transfer)
 
     # Used by bot_test to reset the map to default state for easy updating
     def reset_map(self):
         self.temp_updates = []
         self.last_update = []
-        keys = self.regions.keys()
-        for key in keys:
-            self.regions[key].owner = const.NEUTRAL
-            self.regions[key].troop_count = const.STARTING_TROOPS_PER_REGION
-
-
-# A collection of regions that represent a larger body (typically a country)
+        self.owners.set_visible([])
+        for region in self.region_list:
+            self.set_region(region, const.NEUTRAL, const.STARTING_TROOPS_PER_REGION)
+        self.belief.reset()
+
+
+# Indexes over the visible regions (Map.last_update) kept up to date as owners change:
+# owned regions per super region, bonus income and the frontier per owner.
+# The frontier collections are dicts used as insertion ordered sets
+class OwnerIndex(object):
+    def __init__(self, game_map):
+        self.map = game_map
+        self.visible = set()            # regions the indexes cover
+        self.frontier = {}              # owner -> {region: None} for owned regions next to another owner
+        self.super_region_counts = {}   # owner -> [owned regions in each super region]
+        self.bonus = {}                 # owner -> bonus armies from completely owned super regions
+
+    # Replaces the visible set, adding regions that came into view and dropping the rest.
+    # New regions are added in the order given so the indexes do not depend on set order
+    def set_visible(self, regions):
+        added = [region for region in dict.fromkeys(regions) if region not in self.visible]
+        regions = set(regions)
+        for region in self.visible - regions:
+            self.remove(region, region.owner)
+        self.visible = regions
+        for region in added:
+            self.add(region)
+        for region in added:
+            self.check_frontier(region)
+
+    # Called by Map.set_region after a region's owner changed
+    def owner_changed(self, region, previous_owner):
+        if region in self.visible:
+            self.remove(region, previous_owner)
+            self.add(region)
+            self.check_frontier(region)
+        for neighbor in region.neighbors:
+            if neighbor in self.visible:
+                self.check_frontier(neighbor)
+
+    def add(self, region):
+        owner = region.owner
+        counts = self.super_region_counts.get(owner)
+        if counts is None:
+            counts = [0] * self.map.num_super_regions
+            self.super_region_counts[owner] = counts
+        super_region = region.super_region
+        counts[super_region.index] += 1
+        if counts[super_region.index] == len(super_region.regions):
+            self.bonus[owner] = self.bonus.get(owner, 0) + super_region.bonus_armies
+
+    def remove(self, region, owner):
+        frontier = self.frontier.get(owner)
+        if frontier is not None:
+            frontier.pop(region, None)
+        counts = self.super_region_counts[owner]
+        super_region = region.super_region
+        if counts[super_region.index] == len(super_region.regions):
+            self.bonus[owner] -= super_region.bonus_armies
+        counts[super_region.index] -= 1
+
+    # Puts a visible region in or out of its owner's frontier
+    def check_frontier(self, region):
+        owner = region.owner
+        frontier = self.frontier.setdefault(owner, {})
+        for neighbor in region.neighbors:
+            if neighbor.owner != owner:
+                frontier[region] = None
+                return
+        frontier.pop(region, None)
+
+
+# A collection of regions that represent a larger body (typically a country).
+# Slotted (no per instance __dict__) since large maps hold many of them
 class SuperRegion(object):
+    __slots__ = ('id', 'index', 'bonus_armies', 'regions')
+
     # Has an additional troop generation if a player controls all regions
-    def __init__(self, super_region_id, bonus_armies):
-        self.id = super_region_id
+    def __init__(self, super_region_id, bonus_armies, index):
+        self.id = super_region_id   # id as the server sends it (str), interned
+        self.index = index          # integer id: position in Map.super_region_list
         self.bonus_armies = bonus_armies
         self.regions = []
 
+    # The server's id as an int, computed so it costs no memory per super region
+    @property
+    def number(self):
+        return int(self.id)
+
 
-# A region (smallest area in the map)
+# A region (smallest area in the map).  Slotted (no per instance __dict__) since
+# large maps hold many of them
 class Region(object):
-    def __init__(self, region_id, super_region):
-        self.id = region_id
+    __slots__ = ('id', 'index', 'owner', 'neighbors', 'troop_count', 'super_region', 'is_on_super_region_border')
+
+    def __init__(self, region_id, super_region, index):
+        self.id = region_id         # id as the server sends it (str), interned
+        self.index = index          # integer id: position in Map.region_list and the ArrayMap arrays
         self.owner = const.NEUTRAL
         self.neighbors = []
         self.troop_count = const.STARTING_TROOPS_PER_REGION
         self.super_region = super_region
         self.is_on_super_region_border = False
 
+    # The server's id as an int, computed so it costs no memory per region
+    @property
+    def number(self):
+        return int(self.id)
+
 
 # The mappings of super_region_id to name as used on www.theaigames.com's site
 class SuperRegionMap(object):
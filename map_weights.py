@@ -7,7 +7,13 @@
 
 # There are 42 regions divided between 6 super regions (see map file for names)
 
-from priority_weights import PriorityWeights
+from registry import Registry
+
+# Map weights by name, as 'module:class' so only the weights used are imported
+MAP_WEIGHTS = {
+    'uniform': 'map_weights:UniformWeights',
+    'priority': 'priority_weights:PriorityWeights',
+}
 
 
 class UniformWeights(object):
@@ -79,15 +85,13 @@ class UniformWeights(object):
 # All available map weights in a convenient dictionary for use in bot_tests
 class MapWeightList(object):
     def __init__(self):
-        self.map_weights = dict()
-        self.map_weights['uniform'] = UniformWeights
-        self.map_weights['priority'] = PriorityWeights
+        self.map_weights = Registry(MAP_WEIGHTS, 'warlight.map_weights')
 
     # Returns all available map weights by name (key)
     def get_map_weights(self):
-        return self.map_weights.keys()
+        return self.map_weights.names()
 
     # Returns an instance of a specific map weight
     def create_map_weight(self, name):
-        weight = self.map_weights[name]()
+        weight = self.map_weights.get(name)()
         return weight
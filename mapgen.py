@@ -0,0 +1,200 @@
+# -------------------------------------------------
+# Seeded generator of large random maps for scale
+# testing.  Regions are laid out on a jittered grid,
+# joined to their grid neighbors and one diagonal per
+# grid square (so the graph stays planar), thinned to a
+# random spanning tree plus a share of the remaining
+# edges, and grown into contiguous super regions.
+#
+# The result has the same setup_map strings as
+# const.TAG_SUPER_REGIONS/TAG_REGIONS/TAG_NEIGHBORS,
+# RegionMap/SuperRegionMap style name tables and a
+# uniform map weight, so every bot can play on it.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+from collections import deque
+import argparse
+import math
+import random
+
+DEFAULT_SUPER_REGION_SIZE = (4, 12)     # smallest and largest super region grown
+DEFAULT_BONUS_RATIO = 0.6               # bonus armies per region of a super region
+DEFAULT_EXTRA_EDGES = 0.5               # share of the edges outside the spanning tree that are kept
+
+
+# A name table in the same shape as RegionMap and SuperRegionMap
+class NameTable(object):
+    def __init__(self, names):
+        self.map = names
+
+
+# Map weight for a generated map: every region weighs 1 and every super region
+# its bonus, like UniformWeights does for the default map
+class GeneratedWeights(object):
+    def __init__(self, generated):
+        self.super_region_weight = dict(zip(generated.super_region_ids, generated.bonus))
+        self.region_weight = {region_id: 1 for region_id in generated.region_ids}
+
+
+# One generated map.  super_regions, regions and neighbors are the setup_map
+# strings, the other fields are the same data in lists
+class GeneratedMap(object):
+    def __init__(self, num_regions, seed=None, super_region_size=DEFAULT_SUPER_REGION_SIZE,
+                 bonus_ratio=DEFAULT_BONUS_RATIO, bonus_range=None, extra_edges=DEFAULT_EXTRA_EDGES):
+        if num_regions < 2:
+            raise ValueError('A map needs at least 2 regions')
+        self.seed = seed
+        rand = random.Random(seed)
+        edges = self.build_edges(num_regions, extra_edges, rand)
+        adjacency = [[] for _ in range(num_regions)]
+        for a, b in edges:
+            adjacency[a].append(b)
+            adjacency[b].append(a)
+        groups = self.grow_super_regions(adjacency, super_region_size, rand)
+
+        # Ids are handed out by super region, as the server does for its maps
+        order = [cell for group in groups for cell in group]
+        region_id = {cell: str(i + 1) for i, cell in enumerate(order)}
+        self.super_region_ids = [str(i + 1) for i in range(len(groups))]
+        self.bonus = []
+        for group in groups:
+            if bonus_range is not None:
+                self.bonus.append(rand.randint(bonus_range[0], bonus_range[1]))
+            else:
+                self.bonus.append(max(1, int(round(len(group) * bonus_ratio))))
+        self.region_ids = [region_id[cell] for cell in order]
+        self.region_super_ids = [self.super_region_ids[i] for i, group in enumerate(groups) for _ in group]
+
+        # Every edge is listed once, under the region with the lower id
+        higher = [[] for _ in range(num_regions)]
+        for a, b in edges:
+            low, high = sorted((int(region_id[a]), int(region_id[b])))
+            higher[low - 1].append(high)
+        self.neighbor_ids = [(str(i + 1), [str(neighbor) for neighbor in sorted(neighbors)])
+                             for i, neighbors in enumerate(higher) if neighbors]
+
+        self.super_regions = ' '.join('{id} {bonus}'.format(id=super_id, bonus=bonus)
+                                      for super_id, bonus in zip(self.super_region_ids, self.bonus))
+        self.regions = ' '.join('{id} {super_id}'.format(id=region, super_id=super_id)
+                                for region, super_id in zip(self.region_ids, self.region_super_ids))
+        self.neighbors = ' '.join('{id} {neighbors}'.format(id=region, neighbors=','.join(neighbors))
+                                  for region, neighbors in self.neighbor_ids)
+        self.region_names = NameTable({region: 'Region {id}'.format(id=region) for region in self.region_ids})
+        self.super_region_names = NameTable({super_id: 'Super Region {id}'.format(id=super_id)
+                                             for super_id in self.super_region_ids})
+
+    # Edges of a jittered grid of `num_regions` cells: right and down neighbors plus
+    # one random diagonal across every square of four cells, so no two edges cross,
+    # reduced to a random spanning tree and a share of the other edges
+    @staticmethod
+    def build_edges(num_regions, extra_edges, rand):
+        width = int(math.ceil(math.sqrt(num_regions)))
+        candidates = []
+        for cell in range(num_regions):
+            column = cell % width
+            if column + 1 < width and cell + 1 < num_regions:
+                candidates.append((cell, cell + 1))
+            if cell + width < num_regions:
+                candidates.append((cell, cell + width))
+            # The square with `cell` at its top left gets one of its two diagonals
+            if column + 1 < width and cell + width + 1 < num_regions:
+                if rand.random() < 0.5:
+                    candidates.append((cell, cell + width + 1))
+                else:
+                    candidates.append((cell + 1, cell + width))
+        rand.shuffle(candidates)
+
+        # Kruskal's with a union find keeps the map connected
+        parent = list(range(num_regions))
+
+        def find(cell):
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        edges = []
+        for a, b in candidates:
+            root_a = find(a)
+            root_b = find(b)
+            if root_a != root_b:
+                parent[root_a] = root_b
+                edges.append((a, b))
+            elif rand.random() < extra_edges:
+                edges.append((a, b))
+        return edges
+
+    # Splits the cells into contiguous groups by breadth first growth from unassigned
+    # cells.  A group that cannot reach the smallest size joins a neighboring group
+    @staticmethod
+    def grow_super_regions(adjacency, super_region_size, rand):
+        smallest, largest = super_region_size
+        group_of = [None] * len(adjacency)
+        groups = []
+        for start in range(len(adjacency)):
+            if group_of[start] is not None:
+                continue
+            target = rand.randint(smallest, largest)
+            group = [start]
+            group_of[start] = len(groups)
+            queue = deque([start])
+            while queue and len(group) < target:
+                cell = queue.popleft()
+                neighbors = list(adjacency[cell])
+                rand.shuffle(neighbors)
+                for neighbor in neighbors:
+                    if group_of[neighbor] is None and len(group) < target:
+                        group_of[neighbor] = len(groups)
+                        group.append(neighbor)
+                        queue.append(neighbor)
+            joined = None
+            if len(group) < smallest:
+                for cell in group:
+                    for neighbor in adjacency[cell]:
+                        if group_of[neighbor] is not None and group_of[neighbor] != len(groups):
+                            joined = group_of[neighbor]
+                            break
+                    if joined is not None:
+                        break
+            if joined is not None:
+                for cell in group:
+                    group_of[cell] = joined
+                groups[joined].extend(group)
+            else:
+                groups.append(group)
+        return groups
+
+    # The map as the local engine's GameMap
+    def game_map(self):
+        import engine
+        return engine.GameMap(self.super_regions, self.regions, self.neighbors)
+
+    # Map weight that covers every region of this map
+    def weights(self):
+        return GeneratedWeights(self)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a random map and print its setup_map strings')
+    parser.add_argument('regions', type=int, help='number of regions')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--super-region-size', type=int, nargs=2, default=list(DEFAULT_SUPER_REGION_SIZE))
+    parser.add_argument('--bonus-ratio', type=float, default=DEFAULT_BONUS_RATIO)
+    parser.add_argument('--bonus-range', type=int, nargs=2, default=None)
+    parser.add_argument('--extra-edges', type=float, default=DEFAULT_EXTRA_EDGES)
+    parser.add_argument('--summary', action='store_true', help='print sizes and degrees instead of the strings')
+    args = parser.parse_args()
+
+    generated = GeneratedMap(args.regions, args.seed, tuple(args.super_region_size), args.bonus_ratio,
+                             args.bonus_range, args.extra_edges)
+    if args.summary:
+        num_edges = sum(len(neighbors) for _, neighbors in generated.neighbor_ids)
+        print('{r} regions, {s} super regions, {e} edges, average degree {d:.2f}'.format(
+            r=len(generated.region_ids), s=len(generated.super_region_ids), e=num_edges,
+            d=2.0 * num_edges / len(generated.region_ids)))
+    else:
+        print('setup_map super_regions ' + generated.super_regions)
+        print('setup_map regions ' + generated.regions)
+        print('setup_map neighbors ' + generated.neighbors)
@@ -0,0 +1,427 @@
+# -------------------------------------------------
+# MctsBot searches each turn with Monte Carlo Tree
+# Search over placement and attack plans, using the
+# time budget Bot.go gives each phase.
+#
+# Each turn is two tree levels: a placement node whose
+# edges are placement plans, then an attack node whose
+# edges are attack plans.  Attack edges lead (through
+# sampled battles and a simulated opponent reply) to
+# next turn placement nodes keyed by the Zobrist hash
+# of the resulting state.  Nodes live in a bounded
+# transposition table that is kept between turns, so a
+# reached state reuses its statistics, and the attack
+# search continues in the subtree of the placement the
+# bot committed to.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import math
+import random
+import time
+from bot import Bot, PlaceArmyBuilder, AttackTransferBuilder, PickStartingBuilder
+from battle import win_probability, expected_survivors, min_attackers
+from regionsorter import Sorter
+from zobrist import TranspositionTable
+import const
+
+EXPLORATION = 1.0           # UCB1 exploration constant
+PLACEMENT_CANDIDATES = 4    # frontier regions considered as targets for all armies
+ATTACK_THRESHOLDS = (0.5, 0.75, 0.9)   # capture chances that attack plans are built around
+ROLLOUT_ATTACK_CHANCE = 0.6     # capture chance the rollout policy needs to attack
+ROLLOUT_TURNS = 2           # turns simulated after leaving the tree
+MAX_TREE_TURNS = 3          # turns below the root the tree may grow
+EXPAND_VISITS = 4           # visits of an attack edge before its outcome states get nodes
+VALUE_SCALE = 6.0           # region difference that maps to a ~73% reward
+BONUS_WEIGHT = 2.0          # worth of one bonus army in the value, in regions
+NODE_TABLE_SIZE = 1 << 15
+
+# Share of each go command's time searched.  The attack search stops short of the whole
+# time since its answer is built and sent after the last iteration
+SEARCH_SHARE = {const.PLACE_ARMIES: 0.5, const.ATTACK_TRANSFER: 0.85}
+
+
+# Decision node for the placement part of a turn
+class PlacementNode(object):
+    def __init__(self, actions):
+        self.actions = actions                  # tuples of (region index, qty)
+        self.visits = 0
+        self.edge_visits = [0] * len(actions)
+        self.edge_value = [0.0] * len(actions)
+        self.children = [None] * len(actions)   # AttackNode for each placement
+
+
+# Decision node for the attack part of a turn, reached through one placement
+class AttackNode(object):
+    def __init__(self, actions):
+        self.actions = actions                  # tuples of (from index, to index, qty)
+        self.visits = 0
+        self.edge_visits = [0] * len(actions)
+        self.edge_value = [0.0] * len(actions)
+        self.outcomes = [dict() for _ in actions]  # state hash -> PlacementNode of the next turn
+
+
+# UCB1 over the edges of a node, trying every edge once first
+def select(node):
+    best = 0
+    best_score = -1.0
+    log_visits = math.log(node.visits + 1)
+    for i, visits in enumerate(node.edge_visits):
+        if visits == 0:
+            return i
+        score = node.edge_value[i] / visits + EXPLORATION * math.sqrt(log_visits / visits)
+        if score > best_score:
+            best = i
+            best_score = score
+    return best
+
+
+# The edge that was visited the most, which is the most robust choice
+def most_visited(node):
+    return max(range(len(node.actions)), key=lambda i: (node.edge_visits[i], node.edge_value[i]))
+
+
+class MctsBot(Bot):
+    time_share = SEARCH_SHARE
+
+    def __init__(self, map_weights, heuristic):
+        super(MctsBot, self).__init__(map_weights, heuristic)
+        self.rand = random.Random()
+        self.nodes = TranspositionTable(NODE_TABLE_SIZE)    # kept between turns
+        self.root = None            # placement node of the current turn
+        self.placement_edge = None  # placement the bot committed to this turn
+        self.me = 0                 # owner codes in the map's ArrayMap
+        self.enemy = 0
+        self.iterations = 0         # simulations run during the last go command
+
+    def pick_starting_regions(self, options):
+        option = self.parse_pick_starting_regions(options)
+        ordered_regions = Sorter.top(option, self, 6, False)
+        builder = PickStartingBuilder()
+        builder.add_all(ordered_regions)
+        return builder.to_string()
+
+    # Searches the turn from the top and commits to the best placement
+    def place_armies(self, time_limit):
+        arrays = self.map.arrays
+        self.me = arrays.owner_code(self.name)
+        self.enemy = arrays.owner_code(self.opponents[0] if self.opponents else const.TAG_OPPONENT_NAME)
+        state = self.believed_state()
+
+        self.root = self.nodes.get(state.hash)
+        if self.root is None or self.root_armies(self.root) != self.available_armies:
+            self.root = PlacementNode(self.placement_actions(state, self.me, self.available_armies))
+            self.nodes.store(state.hash, self.root)
+
+        placements = PlaceArmyBuilder(self.name)
+        if not self.root.actions:
+            self.placement_edge = None
+            return placements.to_string()
+        with self.span('search'):
+            self.search(state, None)
+        self.placement_edge = most_visited(self.root)
+        for index, qty in self.root.actions[self.placement_edge]:
+            placements.add(self.map.region_list[index].id, qty)
+        return placements.to_string()
+
+    # Keeps searching below the committed placement and returns the best attack plan
+    def attack_transfer(self, time_limit):
+        attack_transfers = AttackTransferBuilder(self.name)
+        if self.root is None or self.placement_edge is None:
+            return attack_transfers.to_string()
+        state = self.believed_state()
+        with self.span('search'):
+            self.search(state, self.placement_edge)
+        node = self.root.children[self.placement_edge]
+        if node is None or not node.actions:
+            return attack_transfers.to_string()
+        for from_index, to_index, qty in node.actions[most_visited(node)]:
+            attack_transfers.add(self.map.region_list[from_index].id, self.map.region_list[to_index].id, qty)
+        return attack_transfers.to_string()
+
+    # The map as the search sees it: enemy regions out of view get the troops the
+    # map's belief estimates they have grown to since they were last seen
+    def believed_state(self):
+        state = self.map.snapshot()
+        belief = self.map.belief
+        region_list = self.map.region_list
+        for index, seen in enumerate(belief.seen):
+            if seen != belief.turn and state.owner[index] == self.enemy:
+                state.set_code(index, self.enemy, belief.estimated_troops(region_list[index]))
+        return state
+
+    @staticmethod
+    def root_armies(node):
+        return sum(qty for _, qty in node.actions[0]) if node.actions else 0
+
+    # Runs simulations from the root until the phase's deadline, stopping early once the
+    # time left is less than the slowest simulation so far.  If `placement` is set the
+    # first edge is fixed to it, which is how the attack phase reuses the subtree
+    def search(self, state, placement):
+        iterations = 0
+        slowest = 0.0
+        end = self.deadline.end
+        clock = time.monotonic
+        now = clock()
+        while True:
+            self.simulate(state.fork(), placement)
+            iterations += 1
+            previous, now = now, clock()
+            slowest = max(slowest, now - previous)
+            if now + slowest >= end:
+                break
+        self.iterations = iterations
+        if self.instrumentation is not None:
+            self.instrumentation.count('search iterations', iterations)
+
+    # One selection / expansion / rollout / backpropagation pass
+    def simulate(self, state, placement):
+        path = []
+        node = self.root
+        turn = 0
+        while True:
+            # Placement level
+            i = placement if (turn == 0 and placement is not None) else select(node)
+            path.append((node, i))
+            for index, qty in node.actions[i]:
+                state.set_code(index, self.me, state.troops[index] + qty)
+            child = node.children[i]
+            if child is None:
+                actions = self.attack_actions(state, self.me)
+                if turn == 0:
+                    actions = self.order_by_heuristic(state, actions)
+                child = AttackNode(actions)
+                node.children[i] = child
+            node = child
+            if not node.actions:
+                break
+
+            # Attack level, followed by a sampled opponent reply
+            i = select(node)
+            path.append((node, i))
+            self.play_attacks(state, self.me, node.actions[i])
+            self.play_policy_turn(state, self.enemy)
+            turn += 1
+            if turn >= MAX_TREE_TURNS or self.deadline.expired():
+                break
+            outcomes = node.outcomes[i]
+            next_node = outcomes.get(state.hash)
+            if next_node is None:
+                if node.edge_visits[i] < EXPAND_VISITS:
+                    break
+                next_node = PlacementNode(self.placement_actions(state, self.me, self.income(state, self.me)))
+                outcomes[state.hash] = next_node
+                self.nodes.store(state.hash, next_node)
+            node = next_node
+            if not node.actions:
+                break
+
+        reward = self.rollout(state)
+        for node, i in path:
+            node.visits += 1
+            node.edge_visits[i] += 1
+            node.edge_value[i] += reward
+
+    # Plays a few turns of the cheap policy for both players and scores the result.
+    # Stops early at the deadline, so no simulation runs more than a turn past it
+    def rollout(self, state):
+        expired = self.deadline.expired
+        for _ in range(ROLLOUT_TURNS):
+            if expired():
+                break
+            self.play_policy_turn(state, self.me)
+            self.play_policy_turn(state, self.enemy)
+        return self.value(state)
+
+    # Reward in (0, 1) from the region and bonus difference between the players
+    def value(self, state):
+        regions = {self.me: 0, self.enemy: 0}
+        for owner in state.owner:
+            if owner in regions:
+                regions[owner] += 1
+        diff = regions[self.me] - regions[self.enemy] + \
+            BONUS_WEIGHT * (self.income(state, self.me) - self.income(state, self.enemy))
+        return 1.0 / (1.0 + math.exp(-diff / VALUE_SCALE))
+
+    @staticmethod
+    def income(state, code):
+        counts = [0] * state.num_super_regions
+        for index, owner in enumerate(state.owner):
+            if owner == code:
+                counts[state.super_region[index]] += 1
+        income = const.TAG_BASE_ARMIES
+        for super_region, count in enumerate(counts):
+            if count == state.super_region_size[super_region]:
+                income += state.bonus[super_region]
+        return income
+
+    # Frontier regions of `code` with a score for how much placing there is worth:
+    # every neighbor it does not own counts, enemies and regions of small super regions more
+    @staticmethod
+    def scored_frontier(state, code):
+        owner = state.owner
+        adjacency = state.adjacency
+        offsets = state.offsets
+        scored = []
+        for index in range(state.num_regions):
+            if owner[index] != code:
+                continue
+            score = 0.0
+            for position in range(offsets[index], offsets[index + 1]):
+                neighbor = adjacency[position]
+                neighbor_owner = owner[neighbor]
+                if neighbor_owner != code:
+                    score += 1.0 / state.super_region_size[state.super_region[neighbor]]
+                    if neighbor_owner != 0:
+                        score += 1.0
+            if score > 0:
+                scored.append((score, index))
+        scored.sort(reverse=True)
+        return scored
+
+    # Placement plans: every army on one of the best frontier regions, or split over the best two
+    def placement_actions(self, state, code, armies):
+        frontier = self.scored_frontier(state, code)
+        if not frontier:
+            owned = [index for index, owner in enumerate(state.owner) if owner == code]
+            return [((owned[0], armies),)] if owned else []
+        actions = [((index, armies),) for _, index in frontier[:PLACEMENT_CANDIDATES]]
+        if len(frontier) > 1 and armies > 1:
+            actions.append(((frontier[0][1], armies - armies // 2), (frontier[1][1], armies // 2)))
+        return actions
+
+    # Attack plans for the state after placement.  Each plan sends every frontier region
+    # at its most valuable target that meets a capture threshold, and moves interior
+    # troops towards the frontier
+    def attack_actions(self, state, code):
+        owner = state.owner
+        troops = state.troops
+        adjacency = state.adjacency
+        offsets = state.offsets
+        transfers = []
+        targets = []    # (from, [(value, to, defenders)]) for regions with armies to use
+        for index in range(state.num_regions):
+            if owner[index] != code or troops[index] <= 1:
+                continue
+            options = []
+            best_transfer = None
+            for position in range(offsets[index], offsets[index + 1]):
+                neighbor = adjacency[position]
+                if owner[neighbor] != code:
+                    value = 1.0 / state.super_region_size[state.super_region[neighbor]]
+                    if owner[neighbor] != 0:
+                        value += 1.0
+                    options.append((value, neighbor, troops[neighbor]))
+                elif best_transfer is None or self.enemy_neighbors(state, neighbor, code) > \
+                        self.enemy_neighbors(state, best_transfer, code):
+                    best_transfer = neighbor
+            if options:
+                targets.append((index, options))
+            elif best_transfer is not None:
+                transfers.append((index, best_transfer, troops[index] - 1))
+
+        plans = [tuple(transfers)]
+        for threshold in ATTACK_THRESHOLDS:
+            for send_all in (True, False):
+                plan = list(transfers)
+                for index, options in targets:
+                    available = troops[index] - 1
+                    best = None
+                    for value, neighbor, defenders in options:
+                        chance = win_probability(available, defenders)
+                        if chance >= threshold and (best is None or chance * value > best[0]):
+                            best = (chance * value, neighbor, defenders)
+                    if best is not None:
+                        qty = available if send_all else \
+                            min(available, min_attackers(best[2], threshold) or available)
+                        plan.append((index, best[1], qty))
+                plan = tuple(plan)
+                if plan not in plans:
+                    plans.append(plan)
+        return plans
+
+    # Orders the attack plans of the turn being played by the bot's heuristic (lower is
+    # better) on each plan's likely outcome.  The search tries untried edges in order,
+    # so when time is short the heuristic's favourites are the ones explored
+    def order_by_heuristic(self, state, plans):
+        outcomes = []
+        for plan in plans:
+            outcome = state.fork()
+            for from_index, to_index, qty in plan:
+                self.play_likely(outcome, self.me, from_index, to_index, qty)
+            outcomes.append(outcome)
+        scores = self.heuristic.evaluate_many(self, outcomes)
+        return [plans[i] for i in sorted(range(len(plans)), key=scores.__getitem__)]
+
+    # Plays one move with its most likely result: an attack captures the region with
+    # the expected survivors if it is more likely than not to win, else nothing changes
+    @staticmethod
+    def play_likely(state, code, from_index, to_index, qty):
+        qty = min(qty, state.troops[from_index] - 1)
+        if qty <= 0 or state.owner[from_index] != code:
+            return
+        if state.owner[to_index] == code:
+            state.set_code(from_index, code, state.troops[from_index] - qty)
+            state.set_code(to_index, code, state.troops[to_index] + qty)
+        elif win_probability(qty, state.troops[to_index]) >= 0.5:
+            survivors = max(1, int(round(expected_survivors(qty, state.troops[to_index]))))
+            state.set_code(from_index, code, state.troops[from_index] - qty)
+            state.set_code(to_index, code, survivors)
+
+    @staticmethod
+    def enemy_neighbors(state, index, code):
+        owner = state.owner
+        return sum(1 for position in range(state.offsets[index], state.offsets[index + 1])
+                   if owner[state.adjacency[position]] != code)
+
+    # Applies a list of moves for `code`, resolving attacks with sampled battles
+    def play_attacks(self, state, code, moves):
+        for from_index, to_index, qty in moves:
+            owner = state.owner     # re-read, the first write may have copied the array
+            if owner[from_index] != code:
+                continue
+            qty = min(qty, state.troops[from_index] - 1)
+            if qty <= 0:
+                continue
+            if owner[to_index] == code:
+                state.set_code(from_index, code, state.troops[from_index] - qty)
+                state.set_code(to_index, code, state.troops[to_index] + qty)
+            else:
+                self.resolve_attack(state, code, from_index, to_index, qty)
+
+    # Samples a battle outcome from the battle tables instead of rolling every army
+    def resolve_attack(self, state, code, from_index, to_index, qty):
+        defenders = state.troops[to_index]
+        if self.rand.random() < win_probability(qty, defenders):
+            survivors = max(1, int(round(expected_survivors(qty, defenders))))
+            state.set_code(from_index, code, state.troops[from_index] - qty)
+            state.set_code(to_index, code, survivors)
+        else:
+            attackers_lost = min(qty, int(round(defenders * const.TAG_DEFENDER_KILL_CHANCE)))
+            defenders_lost = min(defenders - 1, int(round(qty * const.TAG_ATTACKER_KILL_CHANCE)))
+            state.set_code(from_index, code, state.troops[from_index] - attackers_lost)
+            state.set_code(to_index, state.owner[to_index], defenders - defenders_lost)
+
+    # Cheap policy used for the opponent's reply and rollouts: place everything on a
+    # random frontier region, then attack the weakest neighbor of every frontier region
+    # when the capture chance is good enough
+    def play_policy_turn(self, state, code):
+        frontier = self.scored_frontier(state, code)
+        if not frontier:
+            return
+        index = self.rand.choice(frontier)[1]
+        state.set_code(index, code, state.troops[index] + self.income(state, code))
+        moves = []
+        owner = state.owner
+        troops = state.troops
+        for _, index in frontier:
+            weakest = None
+            for position in range(state.offsets[index], state.offsets[index + 1]):
+                neighbor = state.adjacency[position]
+                if owner[neighbor] != code and (weakest is None or troops[neighbor] < troops[weakest]):
+                    weakest = neighbor
+            if weakest is not None and \
+                    win_probability(troops[index] - 1, troops[weakest]) >= ROLLOUT_ATTACK_CHANCE:
+                moves.append((index, weakest, troops[index] - 1))
+        self.play_attacks(state, code, moves)
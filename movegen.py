@@ -0,0 +1,127 @@
+# -------------------------------------------------
+# Shared legal move generation over map.Map.  Every
+# function is a generator, so bots and searches can
+# stop early or keep only the best few candidates
+# (see best_per_region) instead of building and
+# sorting every move on the map.
+#
+# Dominated moves are pruned as they are generated:
+# attacks below a capture chance, placements on
+# regions with no unowned neighbor and transfers that
+# do not bring armies closer to the frontier.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+from collections import namedtuple, deque
+from battle import win_probability, min_attackers
+
+HOPELESS_CHANCE = 0.05      # attacks with a lower capture chance are never generated by default
+
+# A placement of `armies` on `region`
+Placement = namedtuple('Placement', ['region', 'armies'])
+
+# An attack or transfer of `armies` from `source` to `target`.  `chance` is the
+# capture chance for attacks and 1.0 for transfers
+Move = namedtuple('Move', ['source', 'target', 'armies', 'chance'])
+
+
+def is_attack(move):
+    return move.target.owner != move.source.owner
+
+
+# Frontier regions of `name` (owned regions next to one it does not own), the only
+# regions where placing armies can matter this turn
+def placement_targets(game_map, name):
+    return iter(game_map.get_frontier(name))
+
+
+# Placements of each size in `sizes` (default every army at once) on every frontier region
+def placements(game_map, name, armies, sizes=None):
+    sizes = sizes or (armies,)
+    for region in placement_targets(game_map, name):
+        for size in sizes:
+            if 0 < size <= armies:
+                yield Placement(region, size)
+
+
+# Attacks from every frontier region on each neighbor it does not own.  Every region
+# keeps `reserve` armies at home.  With `confidence` set, an attack sends only the
+# armies needed to reach that capture chance when it has more than enough; attacks
+# under `min_chance` are pruned
+def attacks(game_map, name, min_chance=HOPELESS_CHANCE, confidence=None, reserve=1):
+    for region in game_map.get_frontier(name):
+        available = region.troop_count - reserve
+        if available <= 0:
+            continue
+        for neighbor in region.neighbors:
+            if neighbor.owner == name:
+                continue
+            chance = win_probability(available, neighbor.troop_count)
+            if chance < min_chance or chance <= 0.0:
+                continue
+            armies = available
+            if confidence is not None and chance >= confidence:
+                needed = min_attackers(neighbor.troop_count, confidence)
+                if needed is not None:
+                    armies = min(available, needed)
+                    chance = win_probability(armies, neighbor.troop_count)
+            yield Move(region, neighbor, armies, chance)
+
+
+# Hops from each owned region to the nearest frontier region through owned regions,
+# by Region.  Regions cut off from the frontier are left out
+def frontier_distances(game_map, name):
+    distance = {}
+    queue = deque()
+    for region in game_map.get_frontier(name):
+        distance[region] = 0
+        queue.append(region)
+    while queue:
+        region = queue.popleft()
+        for neighbor in region.neighbors:
+            if neighbor.owner == name and neighbor not in distance:
+                distance[neighbor] = distance[region] + 1
+                queue.append(neighbor)
+    return distance
+
+
+# Transfers of every movable army between owned neighbors.  With `toward_frontier`
+# (the default) only transfers that end closer to the frontier are generated, which
+# prunes moves between interior regions and moves away from the front
+def transfers(game_map, name, toward_frontier=True, reserve=1):
+    distance = frontier_distances(game_map, name) if toward_frontier else None
+    for region in game_map.get_owned_regions(name):
+        available = region.troop_count - reserve
+        if available <= 0:
+            continue
+        for neighbor in region.neighbors:
+            if neighbor.owner != name:
+                continue
+            if distance is not None and \
+                    distance.get(neighbor, len(distance)) >= distance.get(region, len(distance)):
+                continue
+            yield Move(region, neighbor, available, 1.0)
+
+
+# Every attack, then every transfer
+def moves(game_map, name, min_chance=HOPELESS_CHANCE, confidence=None, toward_frontier=True, reserve=1):
+    for move in attacks(game_map, name, min_chance, confidence, reserve):
+        yield move
+    for move in transfers(game_map, name, toward_frontier, reserve):
+        yield move
+
+
+# Keeps the highest scoring move of every source region from `candidates` and returns
+# them best first.  `score` maps a move to a number; ties keep generation order.
+# Only one move per region is held at a time, so any number of candidates can be fed in
+def best_per_region(candidates, score):
+    best = {}
+    for position, move in enumerate(candidates):
+        value = score(move)
+        current = best.get(move.source)
+        if current is None or value > current[0]:
+            best[move.source] = (value, position, move)
+    ranked = sorted(best.values(), key=lambda entry: entry[1])
+    ranked.sort(key=lambda entry: entry[0], reverse=True)
+    return [(value, move) for value, position, move in ranked]
@@ -0,0 +1,105 @@
+# -------------------------------------------------
+# Army placement allocator.  Spreads a turn's armies
+# over the frontier to get the most out of them: the
+# chance of capturing the best neighbor of each region
+# plus the chance of holding it against enemy
+# neighbors, both from the battle tables.
+#
+# Allocation is greedy over a heap of marginal gains.
+# Since capture chances are S shaped, a region's gain
+# is the best gain per army over the next few armies,
+# so a region that needs three more armies to matter
+# is not passed over for want of a single one.  The
+# loop runs at most once per army, so the runtime is
+# bounded by the armies and region degrees, and every
+# army is always placed.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import heapq
+from battle import win_probability
+import const
+
+LOOKAHEAD = 8       # most armies a single gain looks ahead over
+DEFENSE_WEIGHT = 1.0
+
+
+# Default value of capturing or holding a region: enemy regions count double and
+# regions of small super regions more, since they finish a bonus sooner
+def default_value(region, name):
+    value = 1.0 + 1.0 / len(region.super_region.regions)
+    if region.owner != name and region.owner != const.NEUTRAL:
+        value += 1.0
+    return value
+
+
+# Expected worth of `region` holding `troops` armies: its best capture plus its
+# chance of surviving the strongest enemy neighbor
+def region_worth(region, troops, name, value):
+    attack = 0.0
+    threat = None
+    for neighbor in region.neighbors:
+        if neighbor.owner == name:
+            continue
+        attack = max(attack, value(neighbor) * win_probability(troops - 1, neighbor.troop_count))
+        if neighbor.owner != const.NEUTRAL:
+            threat = max(threat or 0.0, win_probability(neighbor.troop_count - 1, troops))
+    defense = 0.0 if threat is None else DEFENSE_WEIGHT * value(region) * (1.0 - threat)
+    return attack + defense
+
+
+# Best (gain per army, armies) for adding up to `lookahead` armies to a region
+def best_gain(region, troops, name, value, lookahead):
+    base = region_worth(region, troops, name, value)
+    best = (0.0, 1)
+    for extra in range(1, lookahead + 1):
+        gain = (region_worth(region, troops + extra, name, value) - base) / extra
+        if gain > best[0]:
+            best = (gain, extra)
+    return best
+
+
+# Places `armies` armies for `name` and returns a list of (region, qty), one entry per
+# region used.  `value(region)` scores capturing or holding a region (default
+# default_value); bots plug in their own region scores through it.  If `deadline`
+# (a bot.Deadline) expires, the remaining armies go to the best region found so far
+def allocate(game_map, name, armies, value=None, deadline=None):
+    if armies <= 0:
+        return []
+    if value is None:
+        def value(region):
+            return default_value(region, name)
+    candidates = game_map.get_frontier(name) or game_map.get_owned_regions(name)
+    if not candidates:
+        return []
+
+    placed = {}
+    heap = []
+    for order, region in enumerate(candidates):
+        if deadline is not None and deadline.expired():
+            break
+        gain, extra = best_gain(region, region.troop_count, name, value, min(armies, LOOKAHEAD))
+        heap.append((-gain, order, region, extra))
+    heapq.heapify(heap)
+    fallback = heap[0][2] if heap else candidates[0]
+
+    remaining = armies
+    while remaining and heap:
+        if deadline is not None and deadline.expired():
+            break
+        neg_gain, order, region, extra = heapq.heappop(heap)
+        if neg_gain >= 0.0:     # nothing left improves any region
+            break
+        extra = min(extra, remaining)
+        placed[region] = placed.get(region, 0) + extra
+        remaining -= extra
+        if remaining:
+            gain, extra = best_gain(region, region.troop_count + placed[region], name, value,
+                                    min(remaining, LOOKAHEAD))
+            heapq.heappush(heap, (-gain, order, region, extra))
+
+    if remaining:
+        target = max(placed, key=placed.get) if placed else fallback
+        placed[target] = placed.get(target, 0) + remaining
+    return list(placed.items())
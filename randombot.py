@@ -16,8 +16,8 @@
 # provide a convenient way for us to create new AIs
 
 from bot import Bot, PlaceArmyBuilder, AttackTransferBuilder
+from battle import win_probability
 from random import Random
-from time
 
 # RandomBot as the name implies does everything by choosing randomly
 class RandomBot(Bot):
@@ -34,19 +34,17 @@ class RandomBot(Bot):
 
     # Places up to 2 armies on random regions
     def place_armies(self, time_limit):
-        start = time.time()
         placements = PlaceArmyBuilder(self.name)
         region_index = 0
         troops_remaining = self.available_armies
         owned_regions = self.map.get_owned_regions(self.name)  # returns a copy of references to owned regions
         shuffled_regions = self.rand.shuffle(owned_regions)
 
-        while troops_remaining:
-            end = time.time()
-            region = shuffled_regions[region_index]
+        while troops_remaining and shuffled_regions:
+            region = shuffled_regions[region_index % len(shuffled_regions)]
             
-            if end-start > .3:
-                return placements.to_string()
+            if self.deadline.expired():
+                return self.finish_placements(placements)
 
             if troops_remaining > 1:
                 placements.add(region.id, 2)
@@ -57,12 +55,11 @@ class RandomBot(Bot):
                 region.troop_count += 1
                 troops_remaining -= 1
             region_index += 1
-        return placements.to_string()
+        return self.finish_placements(placements)
 
     # Currently checks whether a region has more than six troops placed to attack,
     # or transfers if more than 1 unit is available.
     def attack_transfer(self, time_limit):
-        start = time.time()
         attack_transfers = AttackTransferBuilder(self.name)
         owned_regions = self.map.get_owned_regions(self.name)
         
@@ -70,7 +67,8 @@ class RandomBot(Bot):
             neighbors = [neighbor for neighbor in region.neighbors]   # make a copy of references to neighbor regions
             while len(neighbors) > 1:
                 target_region = neighbors[self.rand.randrange(0, len(neighbors))]
-                if region.owner != target_region.owner and region.troop_count > 6:
+                if region.owner != target_region.owner and region.troop_count > 6 \
+                        and win_probability(5, target_region.troop_count) > 0:
                     attack_transfers.add(region.id, target_region.id, 5)
                     region.troop_count -= 5
                 elif region.owner == target_region.owner and region.troop_count > 1:
@@ -79,8 +77,7 @@ class RandomBot(Bot):
                 else:
                     neighbors.remove(target_region)
 
-                end = time.time()
-                if end - start > 1.6:
+                if self.deadline.expired():
                     return attack_transfers.to_string()
         
         return attack_transfers.to_string()
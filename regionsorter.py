@@ -1,24 +1,67 @@
+# -------------------------------------------------
+# Orders regions by their map weight.  Map weights
+# never change during a game, so each weights instance
+# gets one WeightIndex, built the first time it is
+# used, holding every region's weight level.  Sorting
+# any list of regions is then a bucket pass over the
+# weight levels instead of a full sort, and picking
+# the best few a partial selection.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import heapq
+import weakref
+
+weight_indexes = weakref.WeakKeyDictionary()     # map weights instance -> WeightIndex
+
+
+# Returns the WeightIndex of a map weights instance, building it on first use
+def get_weight_index(map_weights):
+    index = weight_indexes.get(map_weights)
+    if index is None:
+        index = WeightIndex(map_weights)
+        weight_indexes[map_weights] = index
+    return index
+
+
+class WeightIndex(object):
+    def __init__(self, map_weights):
+        weight = map_weights.region_weight
+        levels = sorted(set(weight.values()))
+        self.num_levels = len(levels)
+        level_of = {value: level for level, value in enumerate(levels)}
+        self.level = {region_id: level_of[value] for region_id, value in weight.items()}
+
+    # Returns `regions` (Region instances, duplicates dropped) ordered by weight.  Regions
+    # of equal weight keep the order they were given in, in both directions
+    def order(self, regions, descending=False):
+        buckets = [[] for _ in range(self.num_levels)]
+        level = self.level
+        for region in dict.fromkeys(regions):
+            buckets[level[region.id]].append(region)
+        if descending:
+            buckets.reverse()
+        return [region for bucket in buckets for region in bucket]
+
+    # Returns the first `k` regions of order(regions, descending) without ordering the rest
+    def top(self, regions, k, descending=False):
+        regions = list(dict.fromkeys(regions))
+        if k >= len(regions):
+            return self.order(regions, descending)
+        level = self.level
+        if descending:
+            return heapq.nlargest(k, regions, key=lambda region: level[region.id])
+        return heapq.nsmallest(k, regions, key=lambda region: level[region.id])
 
 
 class Sorter(object):
+    # Returns `references` ordered by the bot's map weights, ties kept in the given order
     @staticmethod
     def sorting(references, bot, descending):
-        regions = {}
-        #get weight values for regions
-        for i in references:
-            regions[i] = bot.map_weights.region_weight[i.id]
-       
-         
-        regions_by_weight = [[key, value] for key, value in regions.items()]
-        regions_by_weight.sort(key=lambda region: region[1], reverse=descending)
-    
-        #print(regions_by_weight)
-
-        ordered_regions = []
-        for region in regions_by_weight :
-            ordered_regions.append(region[0])
-       
-    
-        return ordered_regions
-        
+        return get_weight_index(bot.map_weights).order(references, descending)
 
+    # Returns the first `k` of sorting(references, bot, descending), without ordering the rest
+    @staticmethod
+    def top(references, bot, k, descending):
+        return get_weight_index(bot.map_weights).top(references, k, descending)
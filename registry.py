@@ -0,0 +1,89 @@
+# -------------------------------------------------
+# Name -> class registries that import lazily.  Each
+# entry is declared as a 'module:attribute' string, in
+# the same form as a setuptools entry point, and its
+# module is only imported the first time the name is
+# used, so a bot only pays for the modules it plays
+# with.  Installed packages can add entries through
+# entry points in the registry's group, which are only
+# looked up when a name is missing or every name is
+# listed.
+#
+# AiList, MapWeightList and HeuristicList are built on
+# this.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import importlib
+
+
+# Returns the object a 'module:attribute' declaration points to.  Anything that is
+# not a string is already the object
+def resolve(target):
+    if not isinstance(target, str):
+        return target
+    module_name, _, attribute = target.partition(':')
+    value = importlib.import_module(module_name)
+    for name in attribute.split('.') if attribute else ():
+        value = getattr(value, name)
+    return value
+
+
+class Registry(object):
+    def __init__(self, declarations, group=None):
+        self.declarations = dict(declarations)  # name -> 'module:attribute' (or the object itself)
+        self.loaded = {}                        # name -> object, filled as names are used
+        self.group = group                      # entry point group searched for more names, if any
+        self.entry_points_loaded = group is None
+
+    # Adds or replaces a name.  `target` is a 'module:attribute' string or the object
+    def register(self, name, target):
+        self.declarations[name] = target
+        self.loaded.pop(name, None)
+
+    # Returns every registered name, without importing anything
+    def names(self):
+        self.load_entry_points()
+        return self.declarations.keys()
+
+    # Returns the object registered as `name`, importing its module on first use
+    def get(self, name):
+        value = self.loaded.get(name)
+        if value is None:
+            if name not in self.declarations:
+                self.load_entry_points()
+            value = resolve(self.declarations[name])
+            self.loaded[name] = value
+        return value
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def __contains__(self, name):
+        if name not in self.declarations:
+            self.load_entry_points()
+        return name in self.declarations
+
+    # Imports every registered name, e.g. to check all of them load
+    def load_all(self):
+        for name in list(self.names()):
+            self.get(name)
+
+    # Adds the names declared by installed packages in this registry's entry point group.
+    # Names already declared win
+    def load_entry_points(self):
+        if self.entry_points_loaded:
+            return
+        self.entry_points_loaded = True
+        try:
+            from importlib import metadata
+        except ImportError:
+            return
+        entry_points = metadata.entry_points()
+        if hasattr(entry_points, 'select'):
+            selected = entry_points.select(group=self.group)
+        else:
+            selected = entry_points.get(self.group, [])
+        for entry_point in selected:
+            self.declarations.setdefault(entry_point.name, entry_point.value)
@@ -71,13 +71,16 @@ class Test(object):
     def test(tester):
         return
 
-    # Function to simplify testing commands by calculating running time
+    # Function to simplify testing commands by calculating running time.
+    # The response and wall/cpu times are also handed to tester.record for batch runs
     @staticmethod
     def run_cmd(tester, cmd):
         Print.cmd_header(cmd)
+        starting_wall = time.perf_counter()
         starting_time = time.process_time()
-        resp = tester.bot.run_cmd(cmd)
+        resp = tester.bot.run_cmd([str(part) for part in cmd])
         elapsed_time = time.process_time() - starting_time
+        tester.record(cmd, resp, time.perf_counter() - starting_wall, elapsed_time)
         return resp, elapsed_time
 
 
@@ -151,8 +154,13 @@ class HeuristicTest(Test):
         print('\nHEURISTIC TEST\n')
         StandardTurnTest.setup_generic_map(tester)
         Print.update_map(tester.bot, tester.region_map)
+        starting_wall = time.perf_counter()
+        starting_time = time.process_time()
         val = tester.bot.heuristic.evaluate(tester.bot)
+        elapsed_time = time.process_time() - starting_time
+        tester.record(['evaluate'], str(val), time.perf_counter() - starting_wall, elapsed_time)
         print('VALUE: ' + str(val))
+        Print.runtime(elapsed_time)
         print('#######################################################')
 
 
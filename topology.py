@@ -0,0 +1,57 @@
+# -------------------------------------------------
+# Static facts about the map graph that never change
+# during a game: degree tables of every region, total,
+# internal and external to its super region.
+#
+# Everything is stored by Region.index / SuperRegion.index
+# (plain ints, no Region objects), so one Topology can be
+# shared by every Map built from the same setup_map
+# commands.  Topologies are cached by a hash of the graph.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+from array import array
+import hashlib
+
+topology_cache = {}     # topology hash -> Topology
+
+
+# Returns the Topology for a map whose regions and neighbors are set up, building it
+# only the first time a graph is seen
+def get_topology(game_map):
+    key = topology_hash(game_map)
+    topology = topology_cache.get(key)
+    if topology is None:
+        topology = Topology(game_map, key)
+        topology_cache[key] = topology
+    return topology
+
+
+# Stable hash of the super regions, region memberships and adjacency
+def topology_hash(game_map):
+    digest = hashlib.sha1()
+    for super_region in game_map.super_region_list:
+        digest.update('{id}:{bonus};'.format(id=super_region.id, bonus=super_region.bonus_armies).encode())
+    for region in game_map.region_list:
+        digest.update('{id}:{super_id}:'.format(id=region.id, super_id=region.super_region.id).encode())
+        digest.update(','.join(neighbor.id for neighbor in region.neighbors).encode())
+        digest.update(b';')
+    return digest.hexdigest()
+
+
+class Topology(object):
+    def __init__(self, game_map, key):
+        self.key = key
+        regions = game_map.region_list
+        self.num_regions = len(regions)
+        self.neighbors = [tuple(neighbor.index for neighbor in region.neighbors) for region in regions]
+        self.super_region = [region.super_region.index for region in regions]
+
+        # Degree tables
+        self.degree = array('H', [len(neighbors) for neighbors in self.neighbors])
+        self.external_degree = array('H', [sum(1 for neighbor in neighbors if self.super_region[neighbor] != sr)
+                                           for neighbors, sr in zip(self.neighbors, self.super_region)])
+        self.internal_degree = array('H', [degree - external for degree, external in
+                                           zip(self.degree, self.external_degree)])
+
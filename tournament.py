@@ -0,0 +1,190 @@
+# -------------------------------------------------
+# Round-robin tournament between every combination of
+# bot, map weight and heuristic.  Each game is played
+# by the local engine in a worker process so a full
+# sweep uses every core.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import time
+import ailist
+import engine
+import heuristics
+import map_weights
+
+# Registries are created once per worker process by init_worker
+worker_lists = {}
+
+
+# A bot, map weight and heuristic combination that takes part in the tournament
+class Entry(object):
+    def __init__(self, bot, weight, heuristic):
+        self.bot = bot
+        self.weight = weight
+        self.heuristic = heuristic
+
+    def name(self):
+        return '{bot}/{weight}/{heuristic}'.format(bot=self.bot, weight=self.weight, heuristic=self.heuristic)
+
+
+# Every combination of the names in AiList, MapWeightList and HeuristicList,
+# optionally limited to the given names
+def all_entries(bots=None, weights=None, heuristics_names=None):
+    bots = bots or list(ailist.AiList().get_bot_names())
+    weights = weights or list(map_weights.MapWeightList().get_map_weights())
+    heuristics_names = heuristics_names or list(heuristics.HeuristicList().get_heuristics())
+    return [Entry(bot, weight, heuristic) for bot, weight, heuristic in
+            itertools.product(bots, weights, heuristics_names)]
+
+
+def init_worker():
+    worker_lists['bots'] = ailist.AiList()
+    worker_lists['weights'] = map_weights.MapWeightList()
+    worker_lists['heuristics'] = heuristics.HeuristicList()
+
+
+def create_bot(entry):
+    weight = worker_lists['weights'].create_map_weight(entry[1])
+    heuristic = worker_lists['heuristics'].create_heuristic(entry[2])
+    return worker_lists['bots'].create_bot(entry[0], weight, heuristic)
+
+
+# Plays one game in a worker.  `task` is (first entry index, second entry index,
+# first entry tuple, second entry tuple, seed, time limit in ms) and only plain
+# tuples cross the process boundary in either direction.
+# Returns (indexes, winner index or None, rounds, forfeits, latency) where latency
+# holds a (sum, count, max) tuple per phase for both players
+def play_game(task):
+    first, second, first_entry, second_entry, seed, time_limit = task
+    if not worker_lists:
+        init_worker()
+    result = engine.Game([create_bot(first_entry), create_bot(second_entry)], seed=seed, time_limit=time_limit,
+                         enforce_limits=True).play()
+    indexes = (first, second)
+    winner = indexes[result.winner] if result.winner is not None else None
+    forfeits = tuple(error is not None for error in result.errors)
+    latency = tuple({phase: (sum(samples), len(samples), max(samples) if samples else 0.0)
+                     for phase, samples in player_latency.items()} for player_latency in result.latency)
+    return indexes, winner, result.rounds, forfeits, latency
+
+
+# Running totals for one entry
+class Standing(object):
+    def __init__(self, entry):
+        self.entry = entry
+        self.games = 0
+        self.wins = 0
+        self.draws = 0
+        self.forfeits = 0
+        self.rounds = 0
+        self.latency = {}   # phase -> [sum, count, max]
+
+    def add_latency(self, latency):
+        for phase, (total, count, worst) in latency.items():
+            stats = self.latency.setdefault(phase, [0.0, 0, 0.0])
+            stats[0] += total
+            stats[1] += count
+            stats[2] = max(stats[2], worst)
+
+    def to_dict(self):
+        return {
+            'entry': self.entry.name(),
+            'games': self.games,
+            'wins': self.wins,
+            'draws': self.draws,
+            'forfeits': self.forfeits,
+            'win_rate': self.wins / self.games if self.games else 0.0,
+            'average_rounds': self.rounds / self.games if self.games else 0.0,
+            'latency': {phase: {'mean': total / count if count else 0.0, 'max': worst}
+                        for phase, (total, count, worst) in self.latency.items()},
+        }
+
+
+# Builds every game of a round-robin where each pair of entries plays `games`
+# games, alternating seats, with `time_limit` ms for every go command
+def schedule(entries, games, seed=None, time_limit=engine.BATCH_TIME_LIMIT):
+    rand = random.Random(seed)
+    tasks = []
+    for first, second in itertools.combinations(range(len(entries)), 2):
+        for game in range(games):
+            seats = (first, second) if game % 2 == 0 else (second, first)
+            tasks.append((seats[0], seats[1], entry_tuple(entries[seats[0]]), entry_tuple(entries[seats[1]]),
+                          rand.getrandbits(32), time_limit))
+    return tasks
+
+
+def entry_tuple(entry):
+    return entry.bot, entry.weight, entry.heuristic
+
+
+# Runs the whole tournament on a process pool and returns the standings sorted
+# by win rate.  `workers` defaults to the number of cores
+def run_tournament(entries, games, workers=None, seed=None, time_limit=engine.BATCH_TIME_LIMIT):
+    tasks = schedule(entries, games, seed, time_limit)
+    standings = [Standing(entry) for entry in entries]
+    workers = workers or multiprocessing.cpu_count()
+    # Many small chunks keep every worker busy until the end of the sweep
+    chunksize = max(1, len(tasks) // (workers * 16))
+
+    if workers == 1:
+        results = map(play_game, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=init_worker)
+        results = pool.imap_unordered(play_game, tasks, chunksize)
+    try:
+        for indexes, winner, rounds, forfeits, latency in results:
+            for player, index in enumerate(indexes):
+                standing = standings[index]
+                standing.games += 1
+                standing.rounds += rounds
+                standing.forfeits += forfeits[player]
+                standing.add_latency(latency[player])
+                if winner is None:
+                    standing.draws += 1
+                elif winner == index:
+                    standing.wins += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    standings.sort(key=lambda standing: standing.wins / standing.games if standing.games else 0.0, reverse=True)
+    return standings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Round-robin tournament of every bot/weight/heuristic combination')
+    parser.add_argument('--games', type=int, default=10, help='games played by each pair of entries')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--bots', nargs='*', help='limit to these AiList names')
+    parser.add_argument('--weights', nargs='*', help='limit to these MapWeightList names')
+    parser.add_argument('--heuristics', nargs='*', help='limit to these HeuristicList names')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--time-limit', type=int, default=engine.BATCH_TIME_LIMIT, help='ms given for each go command')
+    parser.add_argument('--json', help='write the standings to this file')
+    args = parser.parse_args()
+
+    entries = all_entries(args.bots, args.weights, args.heuristics)
+    start = time.perf_counter()
+    standings = run_tournament(entries, args.games, args.workers, args.seed, args.time_limit)
+    elapsed = time.perf_counter() - start
+
+    print('{0:40}  {1:>6}  {2:>6}  {3:>8}  {4:>8}  {5:>10}  {6:>10}'.format(
+        'ENTRY', 'GAMES', 'WIN %', 'FORFEITS', 'ROUNDS', 'PLACE ms', 'ATTACK ms'))
+    for standing in standings:
+        stats = standing.to_dict()
+        print('{0:40}  {1:6}  {2:6.1f}  {3:8}  {4:8.1f}  {5:10.3f}  {6:10.3f}'.format(
+            stats['entry'], stats['games'], stats['win_rate'] * 100, stats['forfeits'], stats['average_rounds'],
+            stats['latency'].get(engine.PHASE_PLACE, {}).get('mean', 0.0) * 1000,
+            stats['latency'].get(engine.PHASE_ATTACK, {}).get('mean', 0.0) * 1000))
+    games = sum(standing.games for standing in standings) // 2
+    print('{n} games in {t:.2f} s'.format(n=games, t=elapsed))
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump([standing.to_dict() for standing in standings], out, indent=2)
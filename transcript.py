@@ -0,0 +1,172 @@
+# -------------------------------------------------
+# Compact binary transcripts of everything a bot was
+# sent and answered, and a replayer that feeds them
+# back into any AiList bot.
+#
+# A transcript is a log of one game's records, each
+# a kind byte, a 4 byte length and the raw line, plus
+# a sidecar index file (log path + '.idx') holding the
+# 8 byte offset where every turn starts.  The reader
+# memory maps the log, so seeking to turn N is one
+# index lookup instead of re-reading the whole game.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+from array import array
+import mmap
+import os
+import struct
+import const
+
+MAGIC = b'WLT1'                 # first bytes of every transcript
+RECORD_HEADER = struct.Struct('<BI')
+COMMAND = 0                     # record kinds
+RESPONSE = 1
+INDEX_SUFFIX = '.idx'
+
+# Every turn on the server starts with the starting armies for the round
+TURN_START = '{settings} {armies}'.format(settings=const.SETTINGS, armies=const.STARTING_ARMIES).encode()
+
+
+# Appends records to a transcript as the bot runs.  An existing transcript at `path`
+# is replaced, since a log holds one game.  Both files are flushed after every
+# command so the log survives a bot that is killed while thinking
+class TranscriptWriter(object):
+    def __init__(self, path):
+        self.path = path
+        self.log = open(path, 'wb')
+        self.index = open(path + INDEX_SUFFIX, 'wb')
+        self.log.write(MAGIC)
+
+    # Records a line sent by the server (bytes, without the newline)
+    def command(self, line):
+        if line.startswith(TURN_START):
+            self.index.write(struct.pack('<Q', self.log.tell()))
+            self.index.flush()
+        self.write(COMMAND, line)
+        self.log.flush()
+
+    # Records the bot's answer to the last command, empty answers are not recorded
+    def response(self, text):
+        if text:
+            self.write(RESPONSE, text.encode())
+
+    def write(self, kind, data):
+        self.log.write(RECORD_HEADER.pack(kind, len(data)))
+        self.log.write(data)
+
+    def close(self):
+        self.log.close()
+        self.index.close()
+
+
+# Memory mapped view of a transcript
+class TranscriptReader(object):
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as log:
+            self.data = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError('{path} is not a transcript'.format(path=path))
+        self.turns = self.load_index()
+
+    # Turn offsets from the index file, or from one scan of the log if it is missing
+    def load_index(self):
+        turns = array('Q')
+        index_path = self.path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as index:
+                turns.frombytes(index.read())
+            return turns
+        for offset, kind, line in self.records(len(MAGIC)):
+            if kind == COMMAND and line.startswith(TURN_START):
+                turns.append(offset)
+        return turns
+
+    def num_turns(self):
+        return len(self.turns)
+
+    # Yields (offset, kind, bytes) for every record from `start` up to `end`
+    def records(self, start, end=None):
+        data = self.data
+        end = len(data) if end is None else end
+        offset = start
+        while offset + RECORD_HEADER.size <= end:
+            kind, length = RECORD_HEADER.unpack_from(data, offset)
+            body = offset + RECORD_HEADER.size
+            yield offset, kind, data[body:body + length]
+            offset = body + length
+
+    # Offsets of the records of turn `turn` (numbered from 1); turn 0 is the setup
+    # before the first round
+    def turn_range(self, turn):
+        start = len(MAGIC) if turn == 0 else self.turns[turn - 1]
+        end = self.turns[turn] if turn < len(self.turns) else len(self.data)
+        return start, end
+
+    # The (kind, bytes) records of one turn
+    def turn(self, turn):
+        start, end = self.turn_range(turn)
+        return [(kind, line) for offset, kind, line in self.records(start, end)]
+
+    def close(self):
+        self.data.close()
+
+
+# Feeds a transcript back into `bot` and returns a list of
+# (command, recorded response, new response) for every command that was answered.
+#
+# Without `turn` the whole game is replayed.  With it, the setup and turn `turn`
+# are replayed; the turns before it only get their state commands (update_map,
+# opponent_moves, settings) so the bot's map matches without running its search
+def replay(bot, reader, turn=None):
+    last = reader.num_turns() if turn is None else turn
+    first = 1 if turn is None else turn
+    results = []
+    for number in range(0, last + 1):
+        decide = number == 0 or number >= first
+        records = reader.turn(number)
+        for position, (kind, line) in enumerate(records):
+            if kind != COMMAND:
+                continue
+            if not decide and line.startswith(const.GO.encode()):
+                continue
+            response = bot.run_line(line)
+            if decide and response:
+                recorded = None
+                if position + 1 < len(records) and records[position + 1][0] == RESPONSE:
+                    recorded = records[position + 1][1].decode()
+                results.append((line.decode(), recorded, response))
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    import ailist
+    import heuristics
+    import map_weights
+
+    parser = argparse.ArgumentParser(description='Replay a recorded transcript into a bot')
+    parser.add_argument('transcript', help='log written by Bot.record_transcript')
+    parser.add_argument('--bot', required=True, help='bot name from AiList')
+    parser.add_argument('--weight', default='uniform', help='map weight name from MapWeightList')
+    parser.add_argument('--heuristic', default='Regions Not Captured', help='heuristic name from HeuristicList')
+    parser.add_argument('--turn', type=int, default=None, help='only decide this turn (numbered from 1)')
+    args = parser.parse_args()
+
+    weight = map_weights.MapWeightList().create_map_weight(args.weight)
+    heuristic = heuristics.HeuristicList().create_heuristic(args.heuristic)
+    replay_bot = ailist.AiList().create_bot(args.bot, weight, heuristic)
+    transcript = TranscriptReader(args.transcript)
+    print('{n} turns recorded'.format(n=transcript.num_turns()))
+    changed = 0
+    for command, recorded, response in replay(replay_bot, transcript, args.turn):
+        same = recorded == response
+        changed += 0 if same else 1
+        print('{mark} {command}'.format(mark=' ' if same else '*', command=command))
+        if not same:
+            print('    recorded: {r}'.format(r=recorded))
+        print('    replayed: {r}'.format(r=response))
+    print('{n} responses changed'.format(n=changed))
+    transcript.close()
@@ -0,0 +1,325 @@
+# -------------------------------------------------
+# Offline tuner for map weights.  A genetic search
+# evolves region_weight vectors for the default map:
+# each candidate plays games with one bot against an
+# opponent using a baseline weight, on the local
+# engine, in worker processes so every core is used.
+#
+# Candidates of a generation play the same seeds and
+# are raced: after every batch of games, candidates
+# whose confidence interval lies below the leader's are
+# dropped, so clearly worse weights stop early.  The
+# search stops once the same weights have led for
+# `patience` generations.  The winner is written out
+# as a map weight module and added to MapWeightList.
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import re
+import time
+import ailist
+import const
+import engine
+import heuristics
+import map_weights
+from map import RegionMap, SuperRegionMap
+
+DEFAULT_WEIGHT_RANGE = (1, 9)   # lowest and highest weight a region can get
+Z_SCORE = 1.96                  # 95% confidence intervals for racing
+
+# Registries are created once per worker process by init_worker
+worker_lists = {}
+
+
+# A map weight made from a candidate's vector
+class CandidateWeights(object):
+    def __init__(self, region_weight, super_region_weight):
+        self.region_weight = region_weight
+        self.super_region_weight = super_region_weight
+
+
+# Settings every game needs, as plain tuples so they can cross the process boundary
+class TuneSettings(object):
+    def __init__(self, bot, opponent, baseline, heuristic, region_ids, super_region_weight,
+                 time_limit=engine.BATCH_TIME_LIMIT):
+        self.bot = bot
+        self.opponent = opponent
+        self.baseline = baseline
+        self.heuristic = heuristic
+        self.region_ids = tuple(region_ids)
+        self.super_region_weight = tuple(super_region_weight.items())
+        self.time_limit = time_limit    # ms given for each go command
+
+    def to_tuple(self):
+        return self.bot, self.opponent, self.baseline, self.heuristic, self.region_ids, self.super_region_weight, \
+            self.time_limit
+
+
+def init_worker():
+    worker_lists['bots'] = ailist.AiList()
+    worker_lists['weights'] = map_weights.MapWeightList()
+    worker_lists['heuristics'] = heuristics.HeuristicList()
+
+
+# Plays one game in a worker.  `task` is (candidate index, weights, game number, seed,
+# settings tuple); the candidate takes the first seat in even games.
+# Returns (candidate index, score) with 1 for a win, 0.5 for a draw and 0 for a loss
+def play_game(task):
+    index, weights, game, seed, settings = task
+    bot_name, opponent, baseline, heuristic_name, region_ids, super_region_weight, time_limit = settings
+    if not worker_lists:
+        init_worker()
+    heuristic = worker_lists['heuristics'].create_heuristic(heuristic_name)
+    candidate = CandidateWeights(dict(zip(region_ids, weights)), dict(super_region_weight))
+    player = worker_lists['bots'].create_bot(bot_name, candidate, heuristic)
+    other = worker_lists['bots'].create_bot(opponent, worker_lists['weights'].create_map_weight(baseline), heuristic)
+    seat = game % 2
+    bots = [player, other] if seat == 0 else [other, player]
+    result = engine.Game(bots, seed=seed, time_limit=time_limit, enforce_limits=True).play()
+    if result.winner is None:
+        return index, 0.5
+    return index, 1.0 if result.winner == seat else 0.0
+
+
+# Wilson score interval of a mean score over `games` games
+def confidence_interval(score, games, z=Z_SCORE):
+    if games == 0:
+        return 0.0, 1.0
+    mean = score / games
+    denominator = 1.0 + z * z / games
+    center = (mean + z * z / (2.0 * games)) / denominator
+    spread = z * math.sqrt(mean * (1.0 - mean) / games + z * z / (4.0 * games * games)) / denominator
+    return center - spread, center + spread
+
+
+# Games played so far by one candidate
+class Evaluation(object):
+    def __init__(self, weights):
+        self.weights = weights
+        self.score = 0.0
+        self.games = 0
+
+    def add(self, score):
+        self.score += score
+        self.games += 1
+
+    def mean(self):
+        return self.score / self.games if self.games else 0.0
+
+    def interval(self):
+        return confidence_interval(self.score, self.games)
+
+
+# Changes each weight with probability `rate` by up to `spread`, kept inside `weight_range`
+def mutate(weights, rand, rate, spread, weight_range):
+    low, high = weight_range
+    changed = list(weights)
+    for i in range(len(changed)):
+        if rand.random() < rate:
+            step = rand.randint(1, spread) * rand.choice((-1, 1))
+            changed[i] = min(high, max(low, changed[i] + step))
+    return tuple(changed)
+
+
+# Takes every weight from one of the two parents
+def crossover(first, second, rand):
+    return tuple(a if rand.random() < 0.5 else b for a, b in zip(first, second))
+
+
+class Tuner(object):
+    def __init__(self, settings, games, batch, workers=None, seed=None):
+        self.settings = settings.to_tuple()
+        self.games = games
+        self.batch = batch
+        self.workers = workers or multiprocessing.cpu_count()
+        self.rand = random.Random(seed)
+        self.pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self.pool = multiprocessing.Pool(self.workers, initializer=init_worker)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+        return False
+
+    def run(self, tasks):
+        if self.pool is None:
+            return map(play_game, tasks)
+        # Many small chunks keep every worker busy until the end of the batch
+        chunksize = max(1, len(tasks) // (self.workers * 16))
+        return self.pool.imap_unordered(play_game, tasks, chunksize)
+
+    # Races `candidates` (weight tuples) over up to `games` games each, all on the same
+    # seeds.  Returns their Evaluations, best mean first
+    def evaluate(self, candidates):
+        evaluations = [Evaluation(weights) for weights in candidates]
+        seeds = [self.rand.getrandbits(32) for _ in range(self.games)]
+        active = list(range(len(evaluations)))
+        played = 0
+        while len(active) > 1 and played < self.games:
+            count = min(self.batch, self.games - played)
+            tasks = [(index, evaluations[index].weights, game, seeds[game], self.settings)
+                     for index in active for game in range(played, played + count)]
+            for index, score in self.run(tasks):
+                evaluations[index].add(score)
+            played += count
+            leader_low = max(evaluations[index].interval()[0] for index in active)
+            active = [index for index in active if evaluations[index].interval()[1] >= leader_low]
+        # Candidates still racing rank ahead of dropped ones
+        evaluations.sort(key=lambda evaluation: (evaluation.games, evaluation.mean()), reverse=True)
+        return evaluations
+
+
+# Runs the genetic search from `start` (a weight tuple) and returns (best weights, history)
+def tune(tuner, start, generations, population, elite, patience, mutation_rate=0.2, spread=2,
+         weight_range=DEFAULT_WEIGHT_RANGE, report=None):
+    rand = tuner.rand
+    parents = [start]
+    best = start
+    unchanged = 0
+    history = []
+    for generation in range(generations):
+        candidates = list(dict.fromkeys(parents))
+        while len(candidates) < population:
+            first, second = rand.choice(parents), rand.choice(parents)
+            child = mutate(crossover(first, second, rand), rand, mutation_rate, spread, weight_range)
+            if child not in candidates:
+                candidates.append(child)
+        evaluations = tuner.evaluate(candidates)
+        leader = evaluations[0]
+        low, high = leader.interval()
+        unchanged = unchanged + 1 if leader.weights == best else 0
+        best = leader.weights
+        history.append({
+            'generation': generation,
+            'score': leader.mean(),
+            'interval': [low, high],
+            'games': sum(evaluation.games for evaluation in evaluations),
+            'weights': list(best),
+        })
+        if report is not None:
+            report(history[-1])
+        if unchanged >= patience:
+            break
+        parents = [evaluation.weights for evaluation in evaluations[:elite]]
+    return best, history
+
+
+# Writes a map weight module holding `region_weight` and `super_region_weight`, in the
+# style of priority_weights.py
+def write_weights(path, class_name, region_weight, super_region_weight, note):
+    region_names = RegionMap().map
+    super_region_names = SuperRegionMap().map
+    lines = [
+        '# -------------------------------------------------',
+        '# Map weights found by tuner.py.',
+        '#',
+    ]
+    lines.extend('# ' + line if line else '#' for line in note)
+    lines.extend([
+        '#',
+        '# @author Joe Coleman',
+        '# -------------------------------------------------',
+        '',
+        '',
+        'class {name}(object):'.format(name=class_name),
+        '    def __init__(self):',
+        '        self.super_region_weight = dict()',
+        '        self.region_weight = dict()',
+    ])
+    parts = const.TAG_REGIONS.split()
+    super_region_of = dict(zip(parts[0::2], parts[1::2]))
+    regions_by_super_region = {}
+    for region_id in region_weight:
+        regions_by_super_region.setdefault(super_region_of.get(region_id), []).append(region_id)
+    for super_id, weight in super_region_weight.items():
+        lines.append('')
+        lines.append('        # {name}'.format(name=super_region_names.get(super_id, super_id)))
+        lines.append("        self.super_region_weight['{id}'] = {weight}".format(id=super_id, weight=weight))
+        for region_id in regions_by_super_region.get(super_id, []):
+            lines.append("        self.region_weight['{id}'] = {weight} # {name}".format(
+                id=region_id, weight=region_weight[region_id], name=region_names.get(region_id, region_id)))
+    with open(path, 'w') as output:
+        output.write('\n'.join(lines) + '\n')
+
+
+# Adds `class_name` from `module` to MapWeightList under `key` by declaring it in
+# map_weights.MAP_WEIGHTS
+def register(key, module, class_name, path=map_weights.__file__):
+    with open(path) as source:
+        text = source.read()
+    entry = "    '{key}': '{module}:{name}',\n".format(key=key, module=module, name=class_name)
+    if entry in text:
+        return
+    entries = list(re.finditer(r"^    '[^']+': '[\w.]+:[\w.]+',\n", text, re.MULTILINE))
+    if not entries:
+        raise ValueError('Could not find MAP_WEIGHTS in ' + path)
+    text = text[:entries[-1].end()] + entry + text[entries[-1].end():]
+    with open(path, 'w') as source:
+        source.write(text)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evolve map weights for the default map with self-play')
+    parser.add_argument('--bot', default='attac', help='AiList name of the bot playing with the tuned weights')
+    parser.add_argument('--opponent', default='attac', help='AiList name of the bot it plays against')
+    parser.add_argument('--baseline', default='uniform', help='MapWeightList name of the opponent\'s weights')
+    parser.add_argument('--start', default='priority', help='MapWeightList name of the weights to start from')
+    parser.add_argument('--heuristic', default='Regions Not Captured', help='heuristic name from HeuristicList')
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--population', type=int, default=8)
+    parser.add_argument('--elite', type=int, default=3, help='best candidates kept as parents')
+    parser.add_argument('--games', type=int, default=60, help='most games played by each candidate')
+    parser.add_argument('--batch', type=int, default=10, help='games between racing checks')
+    parser.add_argument('--patience', type=int, default=4, help='stop after the same leader this many generations')
+    parser.add_argument('--mutation-rate', type=float, default=0.2)
+    parser.add_argument('--weight-range', type=int, nargs=2, default=list(DEFAULT_WEIGHT_RANGE))
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--time-limit', type=int, default=engine.BATCH_TIME_LIMIT, help='ms given for each go command')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--name', default='tuned', help='MapWeightList name of the result')
+    parser.add_argument('--module', default='tuned_weights', help='module the result is written to')
+    parser.add_argument('--class-name', default='TunedWeights')
+    parser.add_argument('--no-register', action='store_true', help='write the module without adding it to MapWeightList')
+    parser.add_argument('--json', default=None, help='write the search history to this file')
+    args = parser.parse_args()
+
+    start_weights = map_weights.MapWeightList().create_map_weight(args.start)
+    region_ids = list(start_weights.region_weight)
+    settings = TuneSettings(args.bot, args.opponent, args.baseline, args.heuristic, region_ids,
+                            start_weights.super_region_weight, args.time_limit)
+
+    def print_generation(entry):
+        print('generation {generation:3}  score {score:.3f}  ({low:.3f}-{high:.3f})  {games} games'.format(
+            low=entry['interval'][0], high=entry['interval'][1], **entry))
+
+    started = time.perf_counter()
+    with Tuner(settings, args.games, args.batch, args.workers, args.seed) as tuner:
+        best, history = tune(tuner, tuple(start_weights.region_weight[region_id] for region_id in region_ids),
+                             args.generations, args.population, args.elite, args.patience, args.mutation_rate,
+                             weight_range=tuple(args.weight_range), report=print_generation)
+    elapsed = time.perf_counter() - started
+
+    note = ['{bot} with these weights against {opponent} with {baseline} weights'.format(
+                bot=args.bot, opponent=args.opponent, baseline=args.baseline),
+            'scored {score:.3f} in the last generation, starting from {start}.'.format(
+                score=history[-1]['score'], start=args.start)]
+    write_weights(args.module + '.py', args.class_name, dict(zip(region_ids, best)),
+                  start_weights.super_region_weight, note)
+    if not args.no_register:
+        register(args.name, args.module, args.class_name)
+    print('{g} generations in {t:.1f} s, weights written to {m}.py'.format(g=len(history), t=elapsed,
+                                                                          m=args.module))
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(history, output, indent=2)
@@ -16,8 +16,8 @@
 # provide a convenient way for us to create new AIs
 
 from bot import Bot, PlaceArmyBuilder, AttackTransferBuilder, PickStartingBuilder
-from map import Map
-from math import factorial
+from battle import win_probability
+from placement import allocate
 from regionsorter import Sorter
 
 
@@ -31,9 +31,9 @@ class TurtleBot(Bot):
     # options[0] is time limit
     def pick_starting_regions(self, options):
         option = self.parse_pick_starting_regions(options)
-        ordered_regions = Sorter.sorting(option, self, False) # false means ascending order
+        ordered_regions = Sorter.top(option, self, 6, False) # false means ascending order
         builder = PickStartingBuilder()
-        builder.add_all(ordered_regions[:6])
+        builder.add_all(ordered_regions)
         return builder.to_string()
 
     # Places armies by prioritizing regions next to unowned regions, in super regions turtlebot controls.
@@ -41,37 +41,27 @@ class TurtleBot(Bot):
         placements = PlaceArmyBuilder(self.name)
         troops_remaining = self.available_armies
         owned, neighbors, outliers = self.map.split_last_update(self.name)
-        
-        super_set = set()
-        for region in owned:
-            super_set.add(region.super_region)
-
-        super_set = list(super_set)
-        super_list = list()
-        for x in super_set:
-            unowned = len(x.regions) - len(Map.get_owned_in_list(x.regions, self.name))
-            super_list.append((x, unowned))
-        super_list.sort(key=lambda super_region: super_region[1])
-
-        if self.turn_elapsed == 1:
-            owned = Sorter.sorting(owned, self, False)
-            best = owned[0]
+
+        if self.turn_elapsed == 1 and owned:
+            best = Sorter.top(owned, self, 1, False)[0]
             placements.add(best.id, troops_remaining)
             troops_remaining = 0
 
-        while troops_remaining:
-            for x in super_list:
-                if x[1] != 0:
-                    for y in x[0].regions:
-                        if y.owner != self.name:
-                            owned_neighbors = Map.get_owned_in_list(y.neighbors, self.name)
-                            for z in owned_neighbors:
-                                if troops_remaining > 0:
-                                    placements.add(z.id, 1)
-                                    troops_remaining -= 1
+        for region, qty in allocate(self.map, self.name, troops_remaining, self.region_value, self.deadline):
+            placements.add(region.id, qty)
 
         self.turn_elapsed = self.turn_elapsed + 1
-        return placements.to_string()
+        return self.finish_placements(placements)
+
+    # Value of capturing or holding a region for the placement allocator: regions of
+    # super regions turtlebot already has a hold in count more the fewer are left to take
+    def region_value(self, region):
+        super_region = region.super_region
+        owned = self.map.get_owned_count(super_region, self.name)
+        unowned = len(super_region.regions) - owned
+        if owned == 0 or unowned == 0:
+            return 1.0
+        return 1.0 + 2.0 / unowned
 
     # Currently checks whether a region has more than six troops placed to attack,
     # or transfers if more than 1 unit is available.
@@ -81,7 +71,7 @@ class TurtleBot(Bot):
 
         super_region = dict()
         for key, value in self.map.super_regions.items():
-            unowned = len(value.regions) - len(Map.get_owned_in_list(value.regions, self.name))
+            unowned = len(value.regions) - self.map.get_owned_count(value, self.name)
             super_region[value.id] = unowned
 
         in_danger = dict()
@@ -93,12 +83,12 @@ class TurtleBot(Bot):
             for neighbor in region.neighbors:
                 if neighbor.owner != self.name:
                     # if neighbor.owner in self.opponents:
-                    danger = unowned * edge_weight * (1 - capture_chance(neighbor, region))
+                    danger = unowned * edge_weight * (1 - win_probability(neighbor.troop_count - 1, region.troop_count))
                     in_danger[region.id] = in_danger.get(region.id, 1) * danger
 
                     edges = len(neighbor.neighbors)
                     not_own = super_region[neighbor.super_region.id]
-                    priority = not_own * edges * (1 - capture_chance(region, neighbor))
+                    priority = not_own * edges * (1 - win_probability(region.troop_count - 1, neighbor.troop_count))
                     if neighbor.is_on_super_region_border:
                         priority = priority * 0.5
                     prioritize.append({
@@ -140,19 +130,3 @@ class TurtleBot(Bot):
                 move["region"].troop_count = 1
 
         return attack_transfers.to_string()
-
-
-# Calculates the cdf for each army destroying AT MOST each enemy army.
-# (1 - capture_chance) gives probability of killing AT LEAST all the enemies armies.
-def capture_chance(region, neighbor):
-    n = region.troop_count
-    k = neighbor.troop_count
-    p = 0.6
-    sum = 0
-
-    while k < n:
-        sum += (factorial(n)/(factorial(k)*factorial(n-k))) * p**k * (1 - p)**(n-k)
-        k += 1
-    return sum
-
-
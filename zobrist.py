@@ -0,0 +1,99 @@
+# -------------------------------------------------
+# Zobrist hashing of map states and a bounded
+# transposition table to memoize evaluations.
+#
+# A map state hashes to the XOR of one 64 bit key per
+# region for its (owner, troop bucket) pair, so a
+# change to one region updates the hash in O(1).
+#
+# @author Joe Coleman
+# -------------------------------------------------
+
+from collections import OrderedDict
+
+MASK = (1 << 64) - 1
+NUM_OWNERS = 1 << 8     # owner codes a region can be keyed on
+NUM_BUCKETS = 16        # troop buckets per (region, owner)
+EXACT_TROOPS = 5        # troop counts below this get their own bucket
+DEFAULT_TABLE_SIZE = 1 << 16
+
+
+# splitmix64 finalizer, used to derive well mixed keys from a seed
+def mix64(value):
+    value = (value + 0x9E3779B97F4A7C15) & MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK
+    return value ^ (value >> 31)
+
+
+# Small troop counts are hashed exactly, larger ones by power of two ranges,
+# since a search rarely cares whether a region holds 40 or 41 armies
+def troop_bucket(troop_count):
+    if troop_count < EXACT_TROOPS:
+        return max(troop_count, 0)
+    return min(EXACT_TROOPS - 3 + troop_count.bit_length(), NUM_BUCKETS - 1)
+
+
+# The random keys for every (region, owner code, troop bucket) combination.
+# Keys are derived from the seed when first needed, so large maps do not pay
+# for combinations that never come up
+class ZobristKeys(object):
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.keys = {}
+
+    # Key of one region state
+    def key(self, index, owner_code, troop_count):
+        combination = (index * NUM_OWNERS + owner_code) * NUM_BUCKETS + troop_bucket(troop_count)
+        key = self.keys.get(combination)
+        if key is None:
+            key = mix64((self.seed << 48) ^ combination)
+            self.keys[combination] = key
+        return key
+
+    # Hash of a whole state from flat owner code and troop arrays
+    def hash_state(self, owner, troops):
+        value = 0
+        for index in range(len(owner)):
+            value ^= self.key(index, owner[index], troops[index])
+        return value
+
+
+# A bounded map of state hash -> value.  When full, the least recently used
+# entry is evicted, so values for the states a search keeps returning to survive
+class TranspositionTable(object):
+    def __init__(self, size=DEFAULT_TABLE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    # Returns the stored value for `key`, or `default` if it is not in the table
+    def get(self, key, default=None):
+        value = self.entries.get(key, self)
+        if value is self:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    # Stores a value, evicting the least recently used entry if the table is full
+    def store(self, key, value):
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+        elif len(entries) >= self.size:
+            entries.popitem(last=False)
+        entries[key] = value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0